@@ -67,10 +67,25 @@ using this algorithm.
 
 """
 import math
-from statsmodels.tsa.stattools import coint
-from statsmodels.tsa.stattools import adfuller
+from collections import deque
 import numpy as np
-import pandas as pd
+
+# NOTE: statsmodels is slow to import, so stattools() below loads it on first use
+
+# MacKinnon (1994) approximate p-value tables for unit root / cointegration 
+# tests with a constant, for N = 1 series (ADF) and N = 2 series (Engle-Granger).
+# These are the coefficients statsmodels' mackinnonp() uses, bundled here so 
+# the streaming tests can compute p-values without importing statsmodels. 
+# tau_max / tau_min: p-value is 1 / 0 beyond these; tau_star: statistic at which
+# the small-p polynomial gives way to the large-p polynomial
+MACKINNON_C = {
+    1: {'tau_max': 2.74, 'tau_min': -18.83, 'tau_star': -1.61,
+        'small_p': (2.1659, 1.4412, 0.038269),
+        'large_p': (1.7339, 0.93202, -0.12745, -0.010368)},
+    2: {'tau_max': 0.92, 'tau_min': -18.86, 'tau_star': -2.62,
+        'small_p': (2.92, 1.5012, 0.039796),
+        'large_p': (2.1945, 0.64695, -0.29198, -0.042377)},
+}
 
 ###################################################
 
@@ -107,6 +122,15 @@ def initialize(context):
     
     context.security_list = [context.s1, context.s2]
     
+    # Optional intraday mode: when set to True the stationarity + cointegration 
+    # tests are kept up to date on every minute bar by a StreamingCointegration
+    # engine over the most recent stream_window minutes of log prices, and 
+    # pairs_trade() uses its results instead of re-running adfuller() + coint()
+    # on the 20-day daily window.
+    context.intraday_tests = False
+    context.stream_window = 390 # one trading day of minute bars
+    context.stream = StreamingCointegration(context.stream_window, lags=1)
+    
     # Run every day, 1 hour after market open.
     schedule_function(pairs_trade, date_rules.every_day(), 
                       time_rules.market_open(minutes=60))
@@ -118,26 +142,214 @@ def initialize(context):
 ###################################################
 
 def handle_data(context, data):
-    # not used since we have a scheduled function
-    pass
+    # only used to feed the streaming tests in intraday mode; trades are 
+    # placed by the scheduled function
+    if context.intraday_tests and all(data.can_trade(context.security_list)):
+        context.stream.update(np.log10(data.current(context.s1, 'price')),
+                              np.log10(data.current(context.s2, 'price')))
     
+###################################################  
+# import statsmodels' test functions the first time they are needed
+def stattools():
+    from statsmodels.tsa import stattools
+    return stattools
+
+###################################################  
+# MacKinnon approximate p-value of an ADF (N=1) or Engle-Granger (N=2) test 
+# statistic from the bundled tables; same result as statsmodels' 
+# mackinnonp(stat, regression='c', N=N)
+def mackinnon_pvalue(stat, N=1):
+    table = MACKINNON_C[N]
+    if stat > table['tau_max']:
+        return 1.0
+    elif stat < table['tau_min']:
+        return 0.0
+    if stat <= table['tau_star']:
+        coef = table['small_p']
+    else:
+        coef = table['large_p']
+    z = sum(c * stat ** i for i, c in enumerate(coef))
+    # standard normal cdf of z
+    return 0.5 * math.erfc(-z / math.sqrt(2))
+
 ###################################################  
 # use augmented Dickey-Fuller to check for stationarity of a time series
 def check_for_stationarity(X, cutoff=0.05):
     # H_0 in adfuller is unit root exists (non-stationary)
     # Need significant p-value for series to be stationary
-    pvalue = adfuller(X)[1]
+    pvalue = stattools().adfuller(X)[1]
     if pvalue < cutoff:
         return True
     else:
         return False
 
+###################################################  
+# Rolling-window ADF + Engle-Granger cointegration tests updated in O(1) per bar.
+#
+# Every test regression used here is a linear function of the same small set of
+# per-bar quantities for the two series y1, y2:
+#
+#    z_t = [1, y1(t-1), y2(t-1), dy1(t), dy2(t), dy1(t-1), dy2(t-1), ... dy2(t-lags)]
+#
+# so the engine keeps the sum of outer products z_t z_t' over the window (plus 
+# the sums needed for the first stage y1 = a + b*y2 regression) and updates it 
+# recursively: the row for the newest bar is added and the row that has just 
+# left the window is subtracted. Any of the regressions' normal equations are 
+# then a projection of those sums, e.g. the Engle-Granger residual 
+# e = y1 - a - b*y2 gives e(t-1) = y1(t-1) - a - b*y2(t-1) for the current a, b.
+# The statistics match adfuller(x, maxlag=lags, autolag=None) and 
+# coint(y1, y2, maxlag=lags, autolag=None) on the same window; unlike the 
+# defaults used by check_for_stationarity(), the lag length is fixed. To limit 
+# rounding error the sums are rebuilt from the stored rows once per window.
+class StreamingCointegration(object):
+
+    def __init__(self, window, lags=1):
+        self.window = window
+        self.lags = lags
+        self.size = 5 + 2 * lags
+        self.points = deque(maxlen=window) # (y1, y2) in the window
+        self.rows = deque()                # z rows of the ADF regressions
+        self.levels = deque()              # [1, y1, y2] rows of the first stage
+        self.anchor = None                 # subtracted from prices, see rebuild()
+        self.since_rebuild = 0
+        self._reset_sums()
+        
+    def _reset_sums(self):
+        self.zz = np.zeros((self.size, self.size))
+        self.ww = np.zeros((3, 3))
+        
+    @property
+    def ready(self):
+        # enough observations for every regression to be estimable
+        return len(self.points) == self.window
+        
+    def update(self, y1, y2):
+        if self.anchor is None:
+            self.anchor = (y1, y2)
+        self.points.append((y1, y2))
+        
+        # add the newest rows, drop the rows that refer to points outside the window
+        w = np.array([1.0, y1 - self.anchor[0], y2 - self.anchor[1]])
+        self.levels.append(w)
+        self.ww += np.outer(w, w)
+        if len(self.levels) > self.window:
+            old = self.levels.popleft()
+            self.ww -= np.outer(old, old)
+            
+        if len(self.points) > self.lags + 1:
+            z = self._row(len(self.points) - 1)
+            self.rows.append(z)
+            self.zz += np.outer(z, z)
+            if len(self.rows) > self.window - self.lags - 1:
+                old = self.rows.popleft()
+                self.zz -= np.outer(old, old)
+                
+        self.since_rebuild += 1
+        if self.since_rebuild >= self.window:
+            self.rebuild()
+            
+    def _row(self, t):
+        # z row for the observation at position t of the window
+        p = self.points
+        a1, a2 = self.anchor
+        z = np.empty(self.size)
+        z[0] = 1.0
+        z[1] = p[t - 1][0] - a1
+        z[2] = p[t - 1][1] - a2
+        for j in range(self.lags + 1):
+            z[3 + 2 * j] = p[t - j][0] - p[t - j - 1][0]
+            z[4 + 2 * j] = p[t - j][1] - p[t - j - 1][1]
+        return z
+        
+    def rebuild(self):
+        # recompute the sums from the points in the window. The prices are
+        # re-anchored on the oldest point so the level terms stay small; the 
+        # regressions all have a constant, so shifting the levels doesn't 
+        # change any of the test statistics
+        self.anchor = self.points[0]
+        self._reset_sums()
+        self.levels = deque()
+        self.rows = deque()
+        for t, (y1, y2) in enumerate(self.points):
+            w = np.array([1.0, y1 - self.anchor[0], y2 - self.anchor[1]])
+            self.levels.append(w)
+            self.ww += np.outer(w, w)
+            if t > self.lags:
+                z = self._row(t)
+                self.rows.append(z)
+                self.zz += np.outer(z, z)
+        self.since_rebuild = 0
+        
+    def _tstat(self, A, c):
+        # t statistic of the first coefficient of the regression of Z c on Z A;
+        # NaN when the regressors are collinear (a series flat for the whole window)
+        XX = A.T.dot(self.zz).dot(A)
+        Xy = A.T.dot(self.zz).dot(c)
+        yy = c.dot(self.zz).dot(c)
+        try:
+            XX_inv = np.linalg.inv(XX)
+        except np.linalg.LinAlgError:
+            return np.nan
+        b = XX_inv.dot(Xy)
+        ssr = max(yy - b.dot(Xy), 0.0)
+        dof = len(self.rows) - A.shape[1]
+        se = np.sqrt(ssr / dof * XX_inv[0, 0])
+        return b[0] / se if se > 0 else -np.inf
+        
+    def adf(self, series=0):
+        # ADF test with constant on y1 (series=0) or y2 (series=1): 
+        # regress dy(t) on [y(t-1), dy(t-1) ... dy(t-lags), 1]
+        k = self.lags
+        A = np.zeros((self.size, k + 2))
+        A[1 + series, 0] = 1.0
+        for j in range(1, k + 1):
+            A[3 + 2 * j + series, j] = 1.0
+        A[0, k + 1] = 1.0
+        c = np.zeros(self.size)
+        c[3 + series] = 1.0
+        stat = self._tstat(A, c)
+        if np.isnan(stat):
+            # no variation to test, e.g. a halted stock: treat it as a unit root
+            return stat, 1.0
+        return stat, mackinnon_pvalue(stat, N=1)
+        
+    def coint(self):
+        # Engle-Granger test: first stage y1 = a + b*y2, then an ADF test without
+        # constant on the residuals e: regress de(t) on [e(t-1), de(t-1) ... ]
+        ww = self.ww
+        try:
+            a, b = np.linalg.solve(ww[np.ix_([0, 2], [0, 2])], ww[[0, 2], 1])
+        except np.linalg.LinAlgError:
+            # y2 flat for the whole window: the pair can't be cointegrated
+            return np.nan, 1.0
+        k = self.lags
+        A = np.zeros((self.size, k + 1))
+        A[0, 0], A[1, 0], A[2, 0] = -a, 1.0, -b
+        for j in range(1, k + 1):
+            A[3 + 2 * j, j], A[4 + 2 * j, j] = 1.0, -b
+        c = np.zeros(self.size)
+        c[3], c[4] = 1.0, -b
+        stat = self._tstat(A, c)
+        if np.isnan(stat):
+            return stat, 1.0
+        return stat, mackinnon_pvalue(stat, N=2)
+
+###################################################  
+# get a base-10 log normalized daily price history for a stock (shared via
+# data.derived() where the runner has it)
+def log_price_history(data, stock, bar_count):
+    if hasattr(data, 'derived'):
+        return data.derived(stock, 'price', bar_count, '1d', 'log10')
+    prices = data.history(stock, 'price', bar_count, '1d')
+    return np.log10(prices.values.astype(float))
+
 ####################################################
 
 def pairs_trade(context, data):
     
-    # if there are open orders awaiting executlon, exit function
-    if len(get_open_orders()) > 0:
+    # if there are open orders awaiting executlon for either stock, exit function
+    # (orders for other securities held in the account don't block this pair)
+    if any(get_open_orders(s) for s in context.security_list):
         return
     
     # init cointegration flag and stock ID's
@@ -145,21 +357,9 @@ def pairs_trade(context, data):
     s1 = context.s1
     s2 = context.s2
     
-    # get 20 days of pricing data for both stocks
-    s1p20 = data.history(context.s1, 'price', 20, '1d')
-    s2p20 = data.history(context.s2, 'price', 20, '1d')
-
-    # extract pricing info from Quantopian series object
-    s1_raw = pd.DataFrame(data = s1p20.values, columns = ["values"])
-    s1_raw = s1_raw.astype(float)
-    
-    # extract pricing info from Quantopian series object
-    s2_raw = pd.DataFrame(data = s2p20.values, columns = ["values"])
-    s2_raw = s2_raw.astype(float)
-    
-    # calculate log10 normalization of each series + calculate spread
-    s1_series = np.log10(s1_raw["values"])
-    s2_series = np.log10(s2_raw["values"])
+    # get 20 days of log10 normalized pricing data for both stocks + calculate spread
+    s1_series = log_price_history(data, context.s1, 20)
+    s2_series = log_price_history(data, context.s2, 20)
     spread = s1_series - s2_series 
     
     # calc mean + std dev of spread for time series
@@ -219,14 +419,24 @@ def pairs_trade(context, data):
         # Otherwise, check for non-stationarity + cointegration of both series
         # to determine whether a new long/short can be implemented
         
+        # in intraday mode use the minute-bar tests kept up to date by handle_data()
+        use_stream = context.intraday_tests and context.stream.ready
+        
         # check both series for non-stationarity
-        s1_stat = check_for_stationarity( s1_series, .10 )
-        s2_stat = check_for_stationarity( s2_series, .10 )
+        if use_stream:
+            s1_stat = context.stream.adf(0)[1] < .10
+            s2_stat = context.stream.adf(1)[1] < .10
+        else:
+            s1_stat = check_for_stationarity( s1_series, .10 )
+            s2_stat = check_for_stationarity( s2_series, .10 )
     
         if not s1_stat and not s2_stat:
             log.info("Both series are non-stationary")
             # check for cointegration
-            score, pvalue, _ = coint(s1_series, s2_series)
+            if use_stream:
+                score, pvalue = context.stream.coint()
+            else:
+                score, pvalue, _ = stattools().coint(s1_series, s2_series)
             if pvalue <= 0.05:
                 s_coint = True
             else: # else exit since the non-stationary series are not cointegrated
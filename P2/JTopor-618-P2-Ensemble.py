@@ -111,6 +111,12 @@ Additional comments:
     To change that behavior, simply increase the weight value within the trade()
     module where the "elif votes == 1:" clause is evaluated. 
     
+    3. Fitting the exact RBF kernel SVC becomes the dominant cost of build_models()
+    as context.ts_length grows. Setting context.svc_mode = 'approx' swaps it for a
+    Nystroem kernel approximation followed by a linear SVC, which fits in linear
+    time. Set context.svc_compare = True to record how often the predictions of
+    the approximate and exact SVCs agree.
+    
 Backtesting this code as-is with $100,000 in initial capital for the period 1/4/2010
 - 4/7/2017 on Apple's stock (AAPL) produces a total return = 347.9%, alpha = 0.09,
 sharpe = 1.29. The algorithm actually outperformed Apple's stock for long streches
@@ -118,9 +124,7 @@ of time as can be seen when executed within Quantopian.
     
 """
 
-from sklearn.ensemble import RandomForestClassifier
-from sklearn import svm  
-from sklearn.naive_bayes import GaussianNB
+# NOTE: sklearn is imported in create_models(), when the models are first built
 
 import math
 
@@ -136,11 +140,28 @@ def initialize(context):
     context.long = False
     context.short = False
     context.shorting_enabled = False
+    
+    # The exact RBF kernel SVC takes roughly quadratic time to fit in the number of
+    # windows, which limits how long ts_length can be. Setting svc_mode = 'approx'
+    # replaces it with a Nystroem approximation of the same kernel followed by a
+    # linear SVC (see approx_svc()). With svc_compare = True the exact SVC is 
+    # also fitted each time and the share of trade() predictions on which the two
+    # agree is recorded as SVC_agreement.
+    context.svc_mode = 'exact'
+    context.svc_components = 100 # number of Nystroem components
+    context.svc_compare = False
+    context.svc_checks = 0 # number of predictions compared
+    context.svc_agree = 0 # number of those on which both SVCs agreed
+    context.SVC_exact = None # exact SVC fitted alongside when comparing
 
-    # initialize the 3 machine learning / classification algorithms
-    context.RFC = RandomForestClassifier(n_estimators=20, random_state = 1)  
-    context.SVC = svm.SVC(random_state = 1)
-    context.GNB = GaussianNB()
+    # the 3 machine learning / classification algorithms are created by 
+    # create_models() the first time build_models() runs
+    context.RFC = None
+    context.SVC = None
+    context.GNB = None
+    # flat array copy of the fitted random forest used for predictions (see 
+    # compile_forest()); None until the first model has been built
+    context.RFC_flat = None
     
     context.RFC_pred = 0  
     context.SVC_pred = 0
@@ -207,20 +228,112 @@ def model_trade(context, data):
     trade(context, data)
 
 ####################################################
+# initialize the 3 machine learning / classification algorithms (any that 
+# haven't been set already)
+def create_models(context):
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn import svm
+    from sklearn.naive_bayes import GaussianNB
+    
+    if context.RFC is None:
+        context.RFC = RandomForestClassifier(n_estimators=20, random_state = 1)
+    if context.SVC is None:
+        if context.svc_mode == 'approx':
+            context.SVC = approx_svc(context)
+        else:
+            context.SVC = svm.SVC(random_state = 1)
+    if context.GNB is None:
+        context.GNB = GaussianNB()
+    if context.svc_mode == 'approx' and context.svc_compare and context.SVC_exact is None:
+        context.SVC_exact = svm.SVC(random_state = 1)
 
-def build_models(context, data):
+####################################################
+# Approximate-kernel replacement for the ensemble's SVC member: the RBF kernel
+# is approximated with svc_components Nystroem features, on which a linear SVC
+# is trained. Fit time grows linearly with the number of windows.
+def approx_svc(context):
+    from sklearn import svm
+    from sklearn.kernel_approximation import Nystroem
+    from sklearn.pipeline import make_pipeline
+    
+    return make_pipeline(Nystroem(n_components=context.svc_components, random_state = 1),
+                         svm.LinearSVC(random_state = 1))
+
+####################################################
+# Export a fitted random forest into flat arrays covering all of its trees: the
+# split feature, threshold and left/right child of every node plus the class
+# probabilities of every leaf. Leaves point back at themselves with an infinite
+# threshold, so a row can be pushed down all trees at once for a fixed number of
+# steps (the depth of the deepest tree) without any per-tree python code.
+def compile_forest(forest):
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    depth = 0
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        leaf = tree.children_left == -1
+        nodes = np.arange(tree.node_count) + offset
         
-    # Get block of minutely price, volume, high, low data
-    recent_prices = data.history(context.s1, 'price', context.ts_length, '1m').values
-    recent_volumes = data.history(context.s1, 'volume', context.ts_length, '1m').values
-    recent_highs = data.history(context.s1, 'high', context.ts_length, '1m').values
-    recent_lows = data.history(context.s1, 'low', context.ts_length, '1m').values
+        features.append(np.where(leaf, 0, tree.feature))
+        thresholds.append(np.where(leaf, np.inf, tree.threshold))
+        lefts.append(np.where(leaf, nodes, tree.children_left + offset))
+        rights.append(np.where(leaf, nodes, tree.children_right + offset))
+        # normalize leaf values to class probabilities as the forest does
+        value = tree.value[:, 0, :]
+        values.append(value / value.sum(axis=1, keepdims=True))
+        
+        roots.append(offset)
+        depth = max(depth, tree.max_depth)
+        offset += tree.node_count
+        
+    return {'feature': np.concatenate(features),
+            'threshold': np.concatenate(thresholds),
+            'left': np.concatenate(lefts),
+            'right': np.concatenate(rights),
+            'value': np.concatenate(values),
+            'roots': np.array(roots),
+            'depth': depth,
+            'classes': forest.classes_}
+
+####################################################
+# Predict classes for one feature row or a small batch of rows with a forest 
+# exported by compile_forest(). Gives the same output as forest.predict()
+def forest_predict(flat, X):
+    # the trees compare features as 32-bit floats
+    X = np.asarray(X, dtype=np.float32)
+    if X.ndim == 1:
+        X = X.reshape(1, -1)
+    rows = np.arange(X.shape[0])[:, None]
     
-    # Make a list of 1's and 0's, 1 when the price increased from the prior bar  
-    price_changes = np.diff(recent_prices) > 0  
-    volume_changes = np.diff(recent_volumes) > 0
-    high_changes = np.diff(recent_highs) > 0
-    low_changes = np.diff(recent_lows) > 0
+    # walk every row down every tree at the same time
+    node = np.tile(flat['roots'], (X.shape[0], 1))
+    for _ in range(flat['depth']):
+        go_left = X[rows, flat['feature'][node]] <= flat['threshold'][node]
+        node = np.where(go_left, flat['left'][node], flat['right'][node])
+        
+    # average the leaf class probabilities over all trees + pick the most likely.
+    # Summed tree by tree and divided like forest.predict_proba() does, so that
+    # (near) ties are broken the same way
+    proba = flat['value'][node].sum(axis=1) / len(flat['roots'])
+    return flat['classes'][np.argmax(proba, axis=1)]
+
+####################################################
+# Make a list of 1's and 0's, 1 when the value of a minutely field (price, volume,
+# high, low) increased from the prior bar; uses data.derived() if available
+def field_changes(data, stock, field, bar_count):
+    if hasattr(data, 'derived'):
+        return data.derived(stock, field, bar_count, '1m', 'up')
+    return np.diff(data.history(stock, field, bar_count, '1m').values) > 0
+
+####################################################
+
+def build_models(context, data):
+        
+    # Get block of minutely price, volume, high, low changes
+    price_changes = field_changes(data, context.s1, 'price', context.ts_length)
+    volume_changes = field_changes(data, context.s1, 'volume', context.ts_length)
+    high_changes = field_changes(data, context.s1, 'high', context.ts_length)
+    low_changes = field_changes(data, context.s1, 'low', context.ts_length)
     
     X = [] # Independent, or input variables
     
@@ -241,46 +354,53 @@ def build_models(context, data):
         Y.append(price_changes[i+context.window_length]) 
 
     # fit all three models
+    create_models(context)
     context.RFC.fit(X, Y) # Generate the random forest model
+    context.RFC_flat = compile_forest(context.RFC) # flat copy for fast predictions
+    
+    if context.svc_mode == 'approx':
+        # use the same kernel width the exact SVC picks by default (gamma='scale')
+        X = np.asarray(X, dtype=float)
+        gamma = 1.0 / (X.shape[1] * X.var()) if X.var() > 0 else 1.0
+        context.SVC.set_params(nystroem__gamma = gamma)
     context.SVC.fit(X, Y) # Generate the SVC model
+    
     context.GNB.fit(X, Y) # Generate Gaussian Naive Bayes model
+    
+    # fit the exact SVC alongside the approximate one so trade() can compare them
+    if context.SVC_exact is not None:
+        context.SVC_exact.fit(X, Y)
 
 ################################################################################
     
 def trade(context, data): 
     
-     # if there are open orders awaiting executlon, exit function
-    if len(get_open_orders()) > 0:
-        return
-
-    if context.RFC : # Check to ensure a model has already been created
+    if context.RFC_flat is not None: # Check to ensure a model has already been created
     
-        # Get recent data for each predictive variable
-        recent_prices = data.history(context.s1, 'price', context.window_length, '1m').values
-                                          
-        recent_volumes = data.history(context.s1, 'volume', context.window_length, '1m').values
-        
-        recent_highs = data.history(context.s1, 'high', context.window_length , '1m').values
-        
-        recent_lows = data.history(context.s1, 'low', context.window_length , '1m').values
-        
-        
-        # Make a list of 1's and 0's, 1 when the price increased from the prior bar  
-        price_changes = np.diff(recent_prices) > 0  
-        volume_changes = np.diff(recent_volumes) > 0
-        high_changes = np.diff(recent_highs) > 0
-        low_changes = np.diff(recent_lows) > 0
+        # Get recent changes for each predictive variable
+        price_changes = field_changes(data, context.s1, 'price', context.window_length)
+        volume_changes = field_changes(data, context.s1, 'volume', context.window_length)
+        high_changes = field_changes(data, context.s1, 'high', context.window_length)
+        low_changes = field_changes(data, context.s1, 'low', context.window_length)
 
         # create a single feature comprised of each variable's recent values
+        # (reshaped to a single row as required by the classifiers' predict())
         target_feature = np.concatenate((price_changes, 
                                          volume_changes, 
                                          high_changes,
-                                         low_changes)).flatten()
+                                         low_changes)).reshape(1, -1)
+        
+        # get predictions from each model (one prediction per row of input)
+        context.RFC_pred = forest_predict(context.RFC_flat, target_feature)[0]  
+        context.SVC_pred = context.SVC.predict(target_feature)[0]
+        context.GNB_pred = context.GNB.predict(target_feature)[0]
         
-        # get predictions from each model
-        context.RFC_pred = context.RFC.predict(target_feature)  
-        context.SVC_pred = context.SVC.predict(target_feature)
-        context.GNB_pred = context.GNB.predict(target_feature)
+        # track how often the approximate SVC agrees with the exact one
+        if context.svc_mode == 'approx' and context.SVC_exact is not None:
+            context.svc_checks += 1
+            if context.SVC_exact.predict(target_feature)[0] == context.SVC_pred:
+                context.svc_agree += 1
+            record(SVC_agreement = context.svc_agree / float(context.svc_checks))
  
         # now tally "votes": sum predicted 0/1 values from the 3 models
         votes = int(context.RFC_pred) + int(context.SVC_pred) + int(context.GNB_pred)
@@ -298,8 +418,9 @@ def trade(context, data):
             # if shorting desired, set -1 <= weight <= 0, e.g., -0.5
             weight = 0
         
-        # make sure stock is currently tradeable
-        if data.can_trade(context.s1):
+        # make sure stock is currently tradeable + has no open orders awaiting
+        # execution. The votes are still recorded below if a trade is skipped
+        if data.can_trade(context.s1) and len(get_open_orders(context.s1)) == 0:
             # get total cash available for trading
             cash = context.portfolio.cash
 
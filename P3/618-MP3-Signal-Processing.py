@@ -116,22 +116,26 @@ def  initialize (context ):
     # delta = a small value used for initializing the transition covaraince
     context. delta  =   0.0001
         
-    # np.eye produces an identity matrix of the size of 2 in this case
-    # this variable is actually the transition covariance, which is an error term
-    # why Vw is used as variable name???
-    context. Vw  = context. delta  /   ( 1  - context. delta )   *  np. eye ( 2 )
+    # the transition covariance is Vw * identity matrix of size 2, which is an
+    # error term; only the scalar on the diagonal is stored
+    context. Vw  = context. delta  /   ( 1  - context. delta )
     
     # init the observation covariance
     context. Ve  =   0.001
-    context. beta  = np. zeros ( 2 )
-
-    context. P  = np. zeros ( ( 2,   2 ) )   # Posterior error estimate
-    context. R  =  None  # estimate of the measurement error aka noise covariance - set to None initially
+    
+    # preallocated filter state, updated in place by kalman_update(): 
+    # [beta_0, beta_1, P_00, P_01, P_11, primed] where beta is the regression 
+    # estimate, P the (symmetric) posterior error estimate and primed is 0 until
+    # the first update (the covariance prediction R starts out as all zeroes)
+    context. kf  = [ 0.0 ] * 6
 
     # set max number of times to update filter before re-initialization required
     context.max_filter_iter = 120
     # set counter for number of times filter has been used
     context.filter_iter = 0
+    # the filter state only depends on the last max_filter_iter days; lets a
+    # local backtest harness (sim.shard) start a run at any filter reset
+    context.state_reset_period = context.max_filter_iter
     
     context. pos  =   None   # position: long or short
     
@@ -146,16 +150,94 @@ def  initialize (context ):
 
 def filter_reset(context, data):
     
-    context. Vw  = context. delta  /   ( 1  - context. delta )   *  np. eye ( 2 )
+    context. Vw  = context. delta  /   ( 1  - context. delta )
     
     # init the observation covariance
     context. Ve  =   0.001
-    context. beta  = np. zeros ( 2 )
-
-    context. P  = np. zeros ( ( 2,   2 ) )   # Posterior error estimate
-    context. R  =  None  # estimate of the measurement error aka noise covariance - set to None initially
+    
+    # zero beta, P and the primed flag in place
+    context. kf [ : ]  = [ 0.0 ] * 6
     context.filter_iter = 0
     
+####################################################################################
+# Specialized Kalman filter update for the two-state regression y = beta_0 * x + beta_1.
+# With an observation vector of [x, 1] every matrix product in the filter reduces 
+# to a handful of scalar expressions, so the update is written out in closed form
+# on python floats instead of building and multiplying 2x2 numpy arrays. 
+# The state list is updated in place. The posterior error estimate uses the
+# Joseph form  P = (I - K x) R (I - K x)' + K Ve K'  which keeps P symmetric and 
+# positive semi-definite; it is algebraically equal to the  P = R - K x R  
+# update used previously.
+# Returns the estimate of y (yhat), the observation variance (Q) and the error (e)
+
+def kalman_update(state, x, y, vw, ve):
+    
+    b0, b1, p00, p01, p11, primed = state
+    
+    # covariance prediction R = P + Vw; all zeroes the first time through
+    if primed:
+        r00 = p00 + vw
+        r01 = p01
+        r11 = p11 + vw
+    else:
+        r00 = r01 = r11 = 0.0
+        
+    # estimate of y + its variance: yhat = x.beta, Q = x R x' + Ve
+    yhat = x * b0 + b1
+    u0 = r00 * x + r01  # u = R x'
+    u1 = r01 * x + r11
+    Q = x * u0 + u1 + ve
+    e = y - yhat
+    
+    # Kalman gain K = R x' / Q + updated beta
+    k0 = u0 / Q
+    k1 = u1 / Q
+    b0 += k0 * e
+    b1 += k1 * e
+    
+    # Joseph form update of P with A = I - K x
+    a00 = 1.0 - k0 * x
+    a10 = -k1 * x
+    a11 = 1.0 - k1
+    m00 = a00 * r00 - k0 * r01  # M = A R
+    m01 = a00 * r01 - k0 * r11
+    m10 = a10 * r00 + a11 * r01
+    m11 = a10 * r01 + a11 * r11
+    
+    state[0] = b0
+    state[1] = b1
+    state[2] = m00 * a00 - m01 * k0 + ve * k0 * k0
+    state[3] = m00 * a10 + m01 * a11 + ve * k0 * k1
+    state[4] = m10 * a10 + m11 * a11 + ve * k1 * k1
+    state[5] = 1.0
+    
+    return yhat, Q, e
+
+####################################################################################
+# Run the filter over entire price histories, e.g. to replay minute or tick data 
+# outside of Quantopian. xs / ys are sequences of prices of the independent and
+# dependent security; the filter is reset every reset_every updates if given. 
+# Returns arrays of yhat, Q, e, beta_0 and beta_1 for every update.
+
+def kalman_replay(xs, ys, delta=0.0001, ve=0.001, reset_every=None):
+    
+    vw = delta / (1 - delta)
+    n = len(xs)
+    out = [[0.0] * n for _ in range(5)]
+    yhats, Qs, es, b0s, b1s = out
+    state = [0.0] * 6
+    update = kalman_update
+    
+    for i, (x, y) in enumerate(zip(np.asarray(xs, dtype=float).tolist(), 
+                                   np.asarray(ys, dtype=float).tolist())):
+        if reset_every and i % reset_every == 0:
+            state[:] = [0.0] * 6
+        yhats[i], Qs[i], es[i] = update(state, x, y, vw, ve)
+        b0s[i] = state[0]
+        b1s[i] = state[1]
+        
+    return tuple(np.array(o) for o in out)
+    
 ####################################################################################
 
 def handle_data(context, data):
@@ -174,30 +256,21 @@ def use_kalman (context, data) :
     context.filter_iter += 1
     
     # get current price of each asset
-    x = np. asarray ( [data.current(context.s1, 'price'),   1.0 ] ). reshape ( ( 1,   2 ) )
+    x = data.current(context.s1, 'price')
     log.info("x")
     log.info(x)
     
     y = data.current(context.s2, 'price')
     log.info("y")
     log.info(y)
-        
-    # update covariance prediction: if first time through, set R to all zeroes
-    if  context. R   is   not   None:
-        context. R  = context. P  + context. Vw # this is the covariance prediction ??
-    else:
-        context. R  = np. zeros ( ( 2,   2 ) )
      
     # ---------------------------------------
-    # update Kalman filter with latest price info
-    
-    # calculate an estimate of price of  context.s2 stock
-    yhat = x. dot (context. beta ) 
+    # update Kalman filter with latest price info: calculates an estimate of 
+    # price of context.s2 stock (yhat), the estimate of the process error (Q) and 
+    # the diff betw actual price and estimated price (e), and updates beta + P
+    yhat, Q, e = kalman_update(context.kf, x, y, context.Vw, context.Ve)
     log.info("yhat")
     log.info(yhat)
-   
-    # calc estimate of the process error
-    Q = x. dot (context. R ). dot (x. T )  + context. Ve
     log.info("Q")
     log.info(Q)
     
@@ -206,8 +279,6 @@ def use_kalman (context, data) :
     log.info("SQRT(Q)")
     log.info(sqrt_Q)
     
-    # calc diff betw actual price and estimated price
-    e = y - yhat   
     log.info("e")
     log.info(e)
     
@@ -216,31 +287,24 @@ def use_kalman (context, data) :
     log.info("Trade Magnitude")
     log.info(trade_mag)
     
-    K = context. R. dot (x. T )  / Q
-    log.info("K")
-    log.info(K)
-
-    context. beta  = context. beta  + K. flatten ( )   *  e   # calculate beta
     log.info("beta")
-    log.info(context.beta)
- 
-    context. P  = context. R  - K   *  x. dot (context. R )    # estimate error
+    log.info(context.kf[0:2])
     log.info("P")
-    log.info(context.P)
+    log.info(context.kf[2:5])
     
     # end update of Kalman filter
     # ---------------------------------------
        
     #record relevant data values
     #beta and alpha (difference betweens actual and expected)
-    record (beta=context. beta [ 0 ], alpha=context. beta [ 1 ] )
+    record (beta=context. kf [ 0 ], alpha=context. kf [ 1 ] )
     # e < 5 only used to filter out extreme values from backest plot; no other reason for it
     if  e   <   5: 
         record (spread= float (e ), Q_upper= float (sqrt_Q ), Q_lower= float (-sqrt_Q ) )
 
     # if estimate of price of stock y is 0, exit since no trade should be executed
     # this can happen during first few iterations after start or after filter reset
-    if yhat == [ 0.]:
+    if yhat == 0.:
         log.info("yhat estimate == 0: Exiting use_kalman()")
         return
    
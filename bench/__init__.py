@@ -0,0 +1,10 @@
+"""
+Synthetic market benchmarks for the P1, P2 and P3 algorithms. Run with
+
+    python -m bench.run
+
+and the strategies' startup time with
+
+    python -m bench.startup
+
+"""
@@ -0,0 +1,258 @@
+"""
+Benchmarks for the hot paths of the three algorithms:
+
+    pairs_trade    P1 pairs_trade() on cointegrated pairs, scaled by number of pairs
+    model_trade    P2 build_models() + trade(), scaled by number of symbols and by
+                   the length of the training time series (context.ts_length),
+                   with the exact or approximate-kernel SVC (context.svc_mode)
+    trade          P2 trade() alone (predictions from already fitted models),
+                   scaled by number of symbols
+    use_kalman     P3 use_kalman() on linearly related pairs, scaled by number of
+                   pairs
+
+Each algorithm instance is loaded through sim.Algorithm and its callback is
+called directly on a range of bars of a synthetic market (see bench.synthetic),
+so only the callback itself is timed. For every case we report
+
+    throughput     callbacks per second
+    p50 / p95      per callback latency in microseconds
+    peak_kb        peak memory allocated during a (shorter) tracemalloc pass
+
+Results are written to bench/results/<label>.json. Passing --compare with an
+earlier results file prints the ratio of every case against it and flags cases
+whose median latency got worse by more than --threshold.
+
+Usage:
+
+    python -m bench.run --label baseline
+    python -m bench.run --label new --compare bench/results/baseline.json
+    python -m bench.run --quick --cases use_kalman
+
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+
+from bench import synthetic
+from sim.algorithm import Algorithm
+from sim.api import sid
+from sim.broker import SimulatedBroker
+from sim.data import BarData
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS = os.path.join(ROOT, 'bench', 'results')
+
+P1 = os.path.join(ROOT, 'P1', 'JTopor-618-P1-PairsTrade.py')
+P2 = os.path.join(ROOT, 'P2', 'JTopor-618-P2-Ensemble.py')
+P3 = os.path.join(ROOT, 'P3', '618-MP3-Signal-Processing.py')
+
+###################################################
+# case setup: each returns the market, the bars to call the callbacks on and a
+# list of (algorithm, callback) pairs
+
+def _load(path, broker):
+    algo = Algorithm(path)
+    algo.broker = broker
+    algo.initialize()
+    return algo
+
+
+def _bars(market, warmup_sessions, every):
+    first = market.session_start[warmup_sessions]
+    return list(range(first, len(market), every))
+
+
+def setup_pairs_trade(pairs):
+    market, sid_pairs = synthetic.cointegrated_pairs(pairs, 30)
+    broker = SimulatedBroker(market)
+    calls = []
+    for s1, s2 in sid_pairs:
+        algo = _load(P1, broker)
+        algo.context.s1 = sid(s1)
+        algo.context.s2 = sid(s2)
+        algo.context.security_list = [algo.context.s1, algo.context.s2]
+        calls.append((algo, algo.module.pairs_trade))
+    return market, _bars(market, 21, 39), calls
+
+
+def setup_model_trade(symbols, ts_length=300, svc_mode='exact'):
+    sessions = 2 + ts_length // synthetic.MINUTES + 2
+    market, sids = synthetic.random_walk_bars(symbols, sessions)
+    broker = SimulatedBroker(market)
+    calls = []
+    for s in sids:
+        algo = _load(P2, broker)
+        algo.context.s1 = sid(s)
+        algo.context.ts_length = ts_length
+        algo.context.svc_mode = svc_mode
+        calls.append((algo, algo.module.model_trade))
+    return market, _bars(market, sessions - 2, 39), calls
+
+
+def setup_trade(symbols):
+    # models are fitted once up front so only the prediction + ordering is timed
+    market, bars, calls = setup_model_trade(symbols)
+    data = BarData(market)
+    data.i = bars[0]
+    for algo, _ in calls:
+        algo.data = data
+        algo.module.build_models(algo.context, data)
+    return market, bars, [(algo, algo.module.trade) for algo, _ in calls]
+
+
+def setup_use_kalman(pairs):
+    market, sid_pairs = synthetic.linear_pairs(pairs, 6)
+    broker = SimulatedBroker(market)
+    calls = []
+    for s1, s2 in sid_pairs:
+        algo = _load(P3, broker)
+        algo.context.s1 = sid(s1)
+        algo.context.s2 = sid(s2)
+        calls.append((algo, algo.module.use_kalman))
+    return market, _bars(market, 1, 1), calls
+
+# name -> (setup function, list of scales); the first scale is used by --quick
+CASES = {
+    'pairs_trade': (setup_pairs_trade, [dict(pairs=1), dict(pairs=4), dict(pairs=16)]),
+    'model_trade': (setup_model_trade, [dict(symbols=1), dict(symbols=4),
+                                        dict(symbols=16), dict(symbols=1, ts_length=1200),
+                                        dict(symbols=1, ts_length=2400),
+                                        dict(symbols=1, ts_length=2400, svc_mode='approx')]),
+    'trade': (setup_trade, [dict(symbols=1), dict(symbols=16)]),
+    'use_kalman': (setup_use_kalman, [dict(pairs=1), dict(pairs=4), dict(pairs=16)]),
+}
+
+###################################################
+
+def _call_all(data, bars, calls, latencies=None):
+    for i in bars:
+        data.i = i
+        for algo, func in calls:
+            algo.data = data
+            start = time.perf_counter()
+            func(algo.context, data)
+            if latencies is not None:
+                latencies.append(time.perf_counter() - start)
+            algo.take_batch()
+
+
+def measure(setup, scale, max_calls=None, mem_calls=20):
+    market, bars, calls = setup(**scale)
+    if max_calls:
+        bars = bars[:max(max_calls // len(calls), 1)]
+
+    # timing pass
+    data = BarData(market)
+    latencies = []
+    start = time.perf_counter()
+    _call_all(data, bars, calls, latencies)
+    total = time.perf_counter() - start
+
+    # memory pass on a fresh set of algorithm instances
+    market, bars, calls = setup(**scale)
+    data = BarData(market)
+    bars = bars[:max(mem_calls // len(calls), 1)]
+    tracemalloc.start()
+    _call_all(data, bars, calls)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies = np.array(latencies) * 1e6
+    return {
+        'calls': len(latencies),
+        'throughput': len(latencies) / total,
+        'p50_us': float(np.percentile(latencies, 50)),
+        'p95_us': float(np.percentile(latencies, 95)),
+        'peak_kb': peak / 1024.0,
+    }
+
+###################################################
+
+def case_name(name, scale):
+    return '%s[%s]' % (name, ','.join('%s=%s' % kv for kv in sorted(scale.items())))
+
+
+def environment():
+    try:
+        rev = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                      stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        rev = None
+    return {
+        'git': rev,
+        'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+    }
+
+
+def compare(results, baseline, threshold):
+    # print each case against the baseline; returns the names of regressed cases
+    regressed = []
+    print('\n%-45s %10s %10s %8s' % ('case', 'p50 (us)', 'base', 'ratio'))
+    for name, r in sorted(results.items()):
+        b = baseline.get(name)
+        if b is None:
+            print('%-45s %10.1f %10s %8s' % (name, r['p50_us'], '-', '-'))
+            continue
+        ratio = r['p50_us'] / b['p50_us']
+        flag = ''
+        if ratio > threshold:
+            flag = '  <== REGRESSION'
+            regressed.append(name)
+        print('%-45s %10.1f %10.1f %8.2f%s' % (name, r['p50_us'], b['p50_us'], ratio, flag))
+    return regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--label', default='latest', help='name of the results file')
+    parser.add_argument('--cases', nargs='*', choices=sorted(CASES), default=sorted(CASES))
+    parser.add_argument('--quick', action='store_true', help='smallest scale of each case only')
+    parser.add_argument('--max-calls', type=int, default=None,
+                        help='cap on the number of callbacks timed per case')
+    parser.add_argument('--compare', help='earlier results file to compare against')
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help='p50 latency ratio above which a case counts as a regression')
+    args = parser.parse_args(argv)
+
+    # the algorithms' statsmodels / sklearn calls warn about deprecated defaults
+    warnings.simplefilter('ignore')
+
+    results = {}
+    for name in args.cases:
+        setup, scales = CASES[name]
+        for scale in scales[:1] if args.quick else scales:
+            key = case_name(name, scale)
+            results[key] = r = measure(setup, scale, args.max_calls)
+            print('%-45s %8d calls %12.1f/s  p50 %10.1f us  p95 %10.1f us  peak %9.1f kB'
+                  % (key, r['calls'], r['throughput'], r['p50_us'], r['p95_us'],
+                     r['peak_kb']))
+
+    if not os.path.isdir(RESULTS):
+        os.makedirs(RESULTS)
+    path = os.path.join(RESULTS, args.label + '.json')
+    with open(path, 'w') as f:
+        json.dump({'environment': environment(), 'results': results}, f, indent=2,
+                  sort_keys=True)
+    print('\nresults written to %s' % path)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""
+Startup time of the three algorithms.
+
+For each strategy a fresh python process times
+
+    sim          importing the simulation harness (numpy, pandas)
+    init         loading the script + initialize()
+    heavy        importing the statsmodels / sklearn modules the script uses on
+                 first test or model fit (see sim.warm.strategy_imports)
+
+and lists any of those heavy modules that were already imported by load +
+initialize() (there should be none). It then times how long a worker forked
+from a pre-warmed parent by sim.warm.warm_pool() takes to run its first task.
+
+Usage:
+
+    python -m bench.startup
+
+"""
+import json
+import os
+import subprocess
+import sys
+
+from bench.run import P1, P2, P3, ROOT
+
+STRATEGIES = (P1, P2, P3)
+
+###################################################
+# each measurement is taken in a fresh interpreter
+
+_STAGES = """
+import json, sys, time, warnings
+warnings.simplefilter('ignore')
+t0 = time.perf_counter()
+from sim.algorithm import Algorithm
+from sim.warm import HEAVY_PACKAGES, prewarm, strategy_imports
+t1 = time.perf_counter()
+algo = Algorithm(%(path)r)
+algo.initialize()
+t2 = time.perf_counter()
+eager = sorted(m for m in sys.modules if m.split('.')[0] in HEAVY_PACKAGES)
+prewarm(strategy_imports(%(path)r))
+t3 = time.perf_counter()
+print(json.dumps({'sim': t1 - t0, 'initialize': t2 - t1, 'heavy': t3 - t2,
+                  'eager': eager}))
+"""
+
+_SPINUP = """
+import json, time, warnings
+warnings.simplefilter('ignore')
+from sim.warm import HEAVY_MODULES, warm_pool
+from bench.startup import ready
+timings = []
+for n in range(%(repeat)d):
+    with warm_pool(1, modules=HEAVY_MODULES) as pool:
+        start = time.perf_counter()
+        pool.submit(ready).result()
+        timings.append(time.perf_counter() - start)
+print(json.dumps({'spinup': min(timings)}))
+"""
+
+
+def ready():
+    # first task on a fresh worker: the heavy modules are already there
+    from sim.warm import HEAVY_MODULES
+    return all(m in sys.modules for m in HEAVY_MODULES)
+
+
+def _python(code):
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    out = subprocess.check_output([sys.executable, '-c', code], cwd=ROOT, env=env)
+    return json.loads(out.decode().strip().splitlines()[-1])
+
+
+def measure_startup(paths=STRATEGIES, repeat=5):
+    # seconds spent in each startup stage, per strategy, plus the worker spin-up
+    report = {}
+    for path in paths:
+        report[os.path.basename(path)] = _python(_STAGES % {'path': path})
+    report['spinup'] = _python(_SPINUP % {'repeat': repeat})['spinup']
+    return report
+
+
+def main():
+    report = measure_startup()
+    spinup = report.pop('spinup')
+    print('%-35s %10s %12s %10s  %s' % ('strategy', 'sim (ms)', 'init (ms)',
+                                         'heavy (ms)', 'eager imports'))
+    for name, r in sorted(report.items()):
+        print('%-35s %10.1f %12.1f %10.1f  %s' % (name, r['sim'] * 1e3, r['initialize'] * 1e3,
+                                                 r['heavy'] * 1e3, len(r['eager']) or '-'))
+    print('\nwarm worker spin-up: %.1f ms' % (spinup * 1e3))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+Deterministic synthetic minute bar generators for benchmarking the algorithms.
+Every generator takes a seed, so the same arguments always produce the same
+MarketData.
+
+    cointegrated_pairs()  log prices of each pair share a random walk and differ
+                          by a mean reverting (AR(1)) spread => input for P1's
+                          pairs_trade()
+
+    random_walk_bars()    independent random walk OHLCV bars => input for P2's
+                          build_models() / trade()
+
+    linear_pairs()        the second price of each pair is a noisy linear
+                          function of the first => input for P3's use_kalman()
+
+Each generator returns the MarketData object plus the sids it created (a list
+of (s1, s2) tuples for the pair generators). The sids are 1, 2, ... unless given,
+e.g. sids=[19660, 2351] to run P1 on its own pair unchanged.
+"""
+import numpy as np
+import pandas as pd
+
+from sim.data import MarketData
+
+MINUTES = 390
+
+###################################################
+
+def minute_index(sessions, start='2016-01-04'):
+    # 9:31 - 16:00 bars for 'sessions' consecutive business days
+    days = pd.bdate_range(start, periods=sessions)
+    offsets = pd.to_timedelta(np.arange(1, MINUTES + 1) + 570, unit='m')
+    return pd.DatetimeIndex((days.values[:, None] + offsets.values[None, :]).ravel())
+
+###################################################
+
+def _bars(index, closes, rng):
+    # wrap a (minutes x sids) close array with plausible open / high / low / volume
+    n, k = closes.shape
+    noise = np.abs(rng.normal(0, 2e-4, (n, k)))
+    opens = np.vstack([closes[:1], closes[:-1]])
+    frames = {
+        'open': opens,
+        'close': closes,
+        'high': np.maximum(opens, closes) * (1 + noise),
+        'low': np.minimum(opens, closes) * (1 - noise),
+        'volume': rng.integers(100, 20000, (n, k)).astype(float),
+    }
+    return dict((f, pd.DataFrame(v, index=index)) for f, v in frames.items())
+
+
+def _market(index, closes, sids, rng):
+    frames = _bars(index, closes, rng)
+    for frame in frames.values():
+        frame.columns = sids
+    return MarketData(frames)
+
+###################################################
+
+def random_walk_bars(n_symbols, sessions, seed=0, vol=5e-4, sids=None):
+    rng = np.random.default_rng(seed)
+    index = minute_index(sessions)
+    start = rng.uniform(20, 200, n_symbols)
+    closes = start * np.exp(np.cumsum(rng.normal(0, vol, (len(index), n_symbols)),
+                                      axis=0))
+    sids = list(sids or range(1, n_symbols + 1))
+    return _market(index, closes, sids, rng), sids
+
+###################################################
+
+def cointegrated_pairs(n_pairs, sessions, seed=0, vol=5e-4, phi=0.995,
+                       spread_vol=3e-4, sids=None):
+    rng = np.random.default_rng(seed)
+    index = minute_index(sessions)
+    n = len(index)
+
+    common = np.cumsum(rng.normal(0, vol, (n, n_pairs)), axis=0)
+    spread = np.zeros((n, n_pairs))
+    shocks = rng.normal(0, spread_vol, (n, n_pairs))
+    for t in range(1, n):
+        spread[t] = phi * spread[t - 1] + shocks[t]
+
+    level = np.log(rng.uniform(20, 200, n_pairs))
+    ratio = np.log(rng.uniform(0.5, 2.0, n_pairs))
+    s1 = np.exp(level + common)
+    s2 = np.exp(level + ratio + common + spread)
+
+    closes = np.empty((n, 2 * n_pairs))
+    closes[:, 0::2] = s1
+    closes[:, 1::2] = s2
+    sids = list(sids or range(1, 2 * n_pairs + 1))
+    return _market(index, closes, sids, rng), list(zip(sids[0::2], sids[1::2]))
+
+###################################################
+
+def linear_pairs(n_pairs, sessions, seed=0, vol=5e-4, noise=0.05, sids=None):
+    rng = np.random.default_rng(seed)
+    index = minute_index(sessions)
+    n = len(index)
+
+    x = rng.uniform(20, 200, n_pairs) * np.exp(
+        np.cumsum(rng.normal(0, vol, (n, n_pairs)), axis=0))
+    beta = rng.uniform(0.5, 1.5, n_pairs)
+    alpha = rng.uniform(-5, 5, n_pairs)
+    y = alpha + beta * x + rng.normal(0, noise, (n, n_pairs))
+
+    closes = np.empty((n, 2 * n_pairs))
+    closes[:, 0::2] = x
+    closes[:, 1::2] = y
+    sids = list(sids or range(1, 2 * n_pairs + 1))
+    return _market(index, closes, sids, rng), list(zip(sids[0::2], sids[1::2]))
@@ -0,0 +1,18 @@
+"""
+Local simulation harness for the Quantopian algorithms in P1, P2 and P3.
+
+The algorithm scripts are written against the Quantopian platform API and can't
+be run from a plain python shell. This package provides just enough of that API
+(minute bar data, scheduling, orders, portfolio) to replay them locally against
+recorded or simulated market data and paper trade them through a simulated
+broker.
+"""
+from sim.api import Asset, sid
+from sim.algorithm import Algorithm
+from sim.broker import SimulatedBroker
+from sim.data import BarData, MarketData
+from sim.feed import ReplayFeed
+from sim.ledger import VectorLedger
+from sim.runner import MultiRunner, PaperRunner
+from sim.shard import ShardedRunner
+from sim.sweep import kalman_sweep
@@ -0,0 +1,144 @@
+"""
+Loads one of the Quantopian algorithm scripts (e.g. P1/JTopor-618-P1-PairsTrade.py)
+as a regular python module and binds the Quantopian API functions it calls to a
+local portfolio + broker.
+
+The scripts reference sid(), schedule_function(), order(), record(), log etc. as
+globals, which Quantopian injects at run time. We do the same: the module is
+loaded under a private name and those globals are set on it before
+initialize() is called. Each loaded algorithm gets its own module object, so
+several algorithms (or several copies of the same script) can be hosted side by
+side.
+
+Orders placed during a callback are not sent to the broker right away. They
+are collected into a batch of pending Orders that the runner submits once the
+callback returns.
+"""
+import importlib.util
+import itertools
+import os
+from collections import namedtuple
+
+import pandas as pd
+
+from sim import api
+from sim.broker import Order
+from sim.portfolio import Account, Portfolio
+
+_module_ids = itertools.count()
+
+Result = namedtuple('Result', 'equity records fills')
+
+###################################################
+
+def load_module(path):
+    # load a script by path; file names like 'JTopor-618-P1-PairsTrade.py' aren't importable
+    name = '_sim_algo_%d' % next(_module_ids)
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+###################################################
+
+class Algorithm(object):
+
+    def __init__(self, source, name=None, capital=100000.0):
+        # source: path to an algorithm script or an already loaded module
+        if isinstance(source, str):
+            self.module = load_module(source)
+            self.name = name or os.path.splitext(os.path.basename(source))[0]
+        else:
+            self.module = source
+            self.name = name or source.__name__
+
+        self.portfolio = Portfolio(capital)
+        self.context = api.Context(self.portfolio, Account(self.portfolio))
+        self.scheduled = []    # (function, date rule, time rule)
+        self.records = {}      # session -> {name: value}
+        self.equity = {}       # session -> closing portfolio value
+        self.fills = []
+        self.batch = []        # orders placed during the current callback
+        self.broker = None
+        self.data = None
+        self.session = None
+        self._bind()
+
+    def _bind(self):
+        m = self.module
+        m.sid = api.sid
+        m.date_rules = api.date_rules
+        m.time_rules = api.time_rules
+        m.log = api.get_logger(self.name)
+        m.schedule_function = self.schedule_function
+        m.set_benchmark = lambda asset: None
+        m.order = self.order
+        m.order_target = self.order_target
+        m.get_open_orders = self.get_open_orders
+        m.cancel_order = self.cancel_order
+        m.record = self.record
+
+    def initialize(self):
+        self.module.initialize(self.context)
+
+    ###################################################
+    # Quantopian API functions bound into the algorithm's module
+
+    def schedule_function(self, func, date_rule=None, time_rule=None):
+        date_rule = date_rule or api.date_rules.every_day()
+        time_rule = time_rule or api.time_rules.market_open()
+        self.scheduled.append((func, date_rule, time_rule))
+
+    def order(self, asset, amount):
+        # Quantopian rounds share amounts toward zero
+        amount = int(amount)
+        if amount != 0:
+            order = Order(None, self.name, asset, amount, self.data.i)
+            self.batch.append(order)
+            return order
+
+    def order_target(self, asset, target):
+        pos = self.portfolio.positions.get(asset)
+        held = pos.amount if pos is not None else 0
+        return self.order(asset, int(target) - held)
+
+    def get_open_orders(self, asset=None):
+        # orders still waiting at the broker plus those placed earlier in this callback
+        pending = [o for o in self.batch if asset is None or o.asset == asset]
+        open_orders = self.broker.open_orders(self.name, asset) + pending
+        if asset is None:
+            result = {}
+            for o in open_orders:
+                result.setdefault(o.asset, []).append(o)
+            return result
+        return open_orders
+
+    def cancel_order(self, order):
+        # order: an Order or an order id; orders placed in the current callback are
+        # dropped from the batch before they reach the broker
+        if isinstance(order, Order) and order in self.batch:
+            self.batch.remove(order)
+            order.status = 'cancelled'
+        else:
+            self.broker.cancel(getattr(order, 'id', order))
+
+    def record(self, *args, **kwargs):
+        # supports both record('name', value, ...) and record(name=value)
+        values = self.records.setdefault(self.session, {})
+        values.update(zip(args[::2], args[1::2]))
+        values.update(kwargs)
+
+    ###################################################
+
+    def take_batch(self):
+        batch, self.batch = self.batch, []
+        return batch
+
+    def apply_fill(self, fill):
+        self.portfolio.apply_fill(fill)
+        self.fills.append(fill)
+
+    def result(self):
+        return Result(pd.Series(self.equity, name=self.name),
+                      pd.DataFrame.from_dict(self.records, orient='index'),
+                      self.fills)
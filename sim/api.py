@@ -0,0 +1,104 @@
+"""
+Local stand-ins for the pieces of the Quantopian API used by the P1, P2 and P3
+algorithms: sid(), date_rules, time_rules, the algorithm context object and the
+logger. The order / record / schedule functions are bound per algorithm by
+sim.algorithm since they need to know which algorithm is calling them.
+
+The scheduling rules are expressed as minute offsets into a trading session so
+that they work for both full and shortened sessions:
+
+    time_rules.market_open(minutes=60)   => 60th bar of the session (10:30)
+    time_rules.market_close(minutes=30)  => 30 minutes before close (15:30)
+
+"""
+import logging
+
+###################################################
+
+class Asset(object):
+    # lightweight replacement for Quantopian's Equity object. Assets compare and
+    # hash by sid so they can be used as dict keys and DataFrame columns
+    __slots__ = ('sid', 'symbol')
+
+    def __init__(self, sid, symbol=None):
+        self.sid = int(sid)
+        self.symbol = symbol
+
+    def __eq__(self, other):
+        return isinstance(other, Asset) and other.sid == self.sid
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash(self.sid)
+
+    def __repr__(self):
+        if self.symbol:
+            return 'Asset(%d [%s])' % (self.sid, self.symbol)
+        return 'Asset(%d)' % self.sid
+
+###################################################
+
+def sid(n):
+    return Asset(n)
+
+###################################################
+
+class DateRule(object):
+    # decides whether a scheduled function runs on a given session
+    def __init__(self, predicate):
+        self.predicate = predicate
+
+    def matches(self, session):
+        return self.predicate(session)
+
+
+class date_rules(object):
+
+    @staticmethod
+    def every_day():
+        return DateRule(lambda session: True)
+
+###################################################
+
+class TimeRule(object):
+    # decides which bar of a session a scheduled function runs on
+    def __init__(self, offset, from_close):
+        self.offset = offset
+        self.from_close = from_close
+
+    def bar_index(self, session_length):
+        if self.from_close:
+            # market_close(minutes=1) is the last full minute before the close
+            return session_length - self.offset - 1
+        # market_open(minutes=1) is the first bar of the session
+        return self.offset - 1
+
+
+class time_rules(object):
+
+    @staticmethod
+    def market_open(minutes=0, hours=0):
+        return TimeRule(max(hours * 60 + minutes, 1), False)
+
+    @staticmethod
+    def market_close(minutes=0, hours=0):
+        return TimeRule(max(hours * 60 + minutes, 1), True)
+
+###################################################
+
+class Context(object):
+    # plain attribute bag handed to initialize() and every scheduled function.
+    # portfolio + account are provided by the owning algorithm
+    def __init__(self, portfolio, account):
+        self.portfolio = portfolio
+        self.account = account
+
+###################################################
+
+def get_logger(name):
+    # Quantopian's log object exposes info / warn / error / debug
+    logger = logging.getLogger('sim.' + name)
+    logger.warn = logger.warning
+    return logger
@@ -0,0 +1,97 @@
+"""
+Local simulated broker for paper trading the algorithms.
+
+Orders placed by an algorithm during one callback are submitted together as a
+single batch (e.g. both legs of a pairs trade). The broker never fills an order
+in the bar it was placed in: an order becomes eligible for filling
+'fill_delay' bars later, and the delay can be set per asset to simulate a slow
+or illiquid symbol. Fills are priced at the current bar's price adjusted by a
+fixed slippage (in basis points) and charged a per-share commission.
+
+Fill notifications are delivered asynchronously through the broker's 'fills'
+queue. The runner drains that queue and applies each fill to the portfolio of
+the algorithm that placed the order, so a slow fill on one symbol only holds up
+the orders for that symbol.
+"""
+import asyncio
+import itertools
+from collections import namedtuple
+
+import numpy as np
+
+Fill = namedtuple('Fill', 'order_id owner asset amount price commission dt')
+
+###################################################
+
+class Order(object):
+
+    def __init__(self, id, owner, asset, amount, created):
+        self.id = id
+        self.owner = owner
+        self.asset = asset
+        self.amount = amount
+        self.created = created    # bar index the order was placed in
+        # 'pending' until the batch it was placed in is submitted, then 'open'
+        self.status = 'pending' if id is None else 'open'
+
+    def __repr__(self):
+        return 'Order(%s, %r, amount=%d, %s)' % (self.id, self.asset, self.amount,
+                                                 self.status)
+
+###################################################
+
+class SimulatedBroker(object):
+
+    def __init__(self, market, commission=0.001, slippage_bps=5.0, fill_delay=1,
+                 latency=None):
+        self.market = market
+        self.commission = commission
+        self.slippage = slippage_bps / 10000.0
+        self.fill_delay = fill_delay
+        # optional per-asset fill delay (in bars) overriding fill_delay
+        self.latency = dict(latency or {})
+
+        self.fills = asyncio.Queue()
+        self.orders = {}
+        self._open = {}
+        self._ids = itertools.count(1)
+
+    async def submit(self, batch):
+        # batch: list of the pending Orders placed in one callback
+        ids = []
+        for order in batch:
+            order.id = str(next(self._ids))
+            order.status = 'open'
+            self.orders[order.id] = order
+            self._open[order.id] = order
+            ids.append(order.id)
+        return ids
+
+    def cancel(self, order_id):
+        order = self._open.pop(order_id, None)
+        if order is not None:
+            order.status = 'cancelled'
+
+    def open_orders(self, owner=None, asset=None):
+        return [o for o in self._open.values()
+                if (owner is None or o.owner == owner)
+                and (asset is None or o.asset == asset)]
+
+    async def on_bar(self, i):
+        # fill every open order whose delay has elapsed and whose asset traded this bar
+        m = self.market
+        dt = m.index[i]
+        for order in list(self._open.values()):
+            delay = self.latency.get(order.asset, self.fill_delay)
+            if i - order.created < delay:
+                continue
+            price = m.value('price', i, m.column(order.asset))
+            if np.isnan(price):
+                continue
+            price *= 1 + self.slippage * np.sign(order.amount)
+            commission = abs(order.amount) * self.commission
+
+            del self._open[order.id]
+            order.status = 'filled'
+            await self.fills.put(Fill(order.id, order.owner, order.asset, order.amount,
+                                      price, commission, dt))
@@ -0,0 +1,229 @@
+"""
+Minute bar storage and the "data" object handed to the algorithms.
+
+MarketData holds one (minutes x assets) array per field. The 'price' field is
+the forward-filled close, as on Quantopian. Daily bars are derived once from the
+minute bars so that data.history(..., '1d') does not have to resample on every
+call. The last daily bar returned by history() is the current, partial session.
+
+BarData is the per-bar view an algorithm sees. It supports the subset of the
+Quantopian data API used by the algorithms in this repo:
+
+    data.current(asset(s), field)
+    data.history(asset(s), field, bar_count, frequency)    frequency = '1m' / '1d'
+    data.can_trade(asset(s))
+
+plus one local extension, data.derived(asset, field, bar_count, frequency,
+transform), which returns a cached transform ('log10', 'diff', 'up') of a history
+window. The algorithms only use it when it's available, so they still run
+unchanged on Quantopian.
+
+Like Quantopian, history() only ever returns full windows. A window reaching
+back past the start of the market data raises HistoryError; the runners start
+late enough to avoid that when no start date is given (see sim.runner).
+"""
+import numpy as np
+import pandas as pd
+
+from sim.api import Asset
+
+FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+
+class HistoryError(ValueError):
+    pass
+
+###################################################
+
+class MarketData(object):
+
+    def __init__(self, frames):
+        # frames: dict of field -> DataFrame indexed by minute, one column per sid
+        close = frames['close']
+        self.index = pd.DatetimeIndex(close.index)
+        self.sids = [int(c) for c in close.columns]
+        self._col = dict((s, j) for j, s in enumerate(self.sids))
+
+        self._values = {}
+        for field in FIELDS:
+            frame = frames[field].reindex(index=close.index, columns=close.columns)
+            self._values[field] = frame.values.astype(float)
+        self._values['price'] = close.ffill().values.astype(float)
+
+        # map every bar to its session + record the first / last bar of each session
+        days = self.index.normalize()
+        self.sessions = pd.DatetimeIndex(days.unique())
+        self.session_of = self.sessions.get_indexer(days)
+        starts = np.searchsorted(self.session_of, np.arange(len(self.sessions)))
+        self.session_start = starts
+        self.session_end = np.append(starts[1:], len(self.index)) - 1
+
+        # derive daily bars for completed sessions
+        last = self.session_end
+        first = self.session_start
+        self._daily = {
+            'open': self._values['open'][first],
+            'close': self._values['close'][last],
+            'price': self._values['price'][last],
+            'high': np.fmax.reduceat(self._values['high'], first, axis=0),
+            'low': np.fmin.reduceat(self._values['low'], first, axis=0),
+            'volume': np.add.reduceat(np.nan_to_num(self._values['volume']), first, axis=0),
+        }
+
+    @classmethod
+    def from_long(cls, df):
+        # build from a long table with columns dt, sid, open, high, low, close, volume
+        df = df.copy()
+        df['dt'] = pd.to_datetime(df['dt'])
+        frames = {}
+        for field in FIELDS:
+            frames[field] = df.pivot(index='dt', columns='sid', values=field).sort_index()
+        return cls(frames)
+
+    @classmethod
+    def from_csv(cls, path):
+        return cls.from_long(pd.read_csv(path))
+
+    def __len__(self):
+        return len(self.index)
+
+    def column(self, asset):
+        return self._col[asset.sid]
+
+    def value(self, field, i, j):
+        return self._values[field][i, j]
+
+    def prices(self, assets):
+        # (minutes x assets) array of the forward-filled close of each asset
+        return self._values['price'][:, [self.column(a) for a in assets]]
+
+    def minute_window(self, field, i, j, bar_count):
+        # the bar_count minute bars ending at (and including) bar i
+        lo = max(i - bar_count + 1, 0)
+        return self.index[lo:i + 1], self._values[field][lo:i + 1, j]
+
+    def daily_window(self, field, i, j, bar_count):
+        # the bar_count daily bars ending with the (partial) session containing bar i
+        s = self.session_of[i]
+        lo = max(s - bar_count + 1, 0)
+        start = self.session_start[s]
+        if field in ('price', 'close'):
+            partial = self._values[field][i, j]
+        elif field == 'open':
+            partial = self._values['open'][start, j]
+        elif field == 'high':
+            partial = np.nanmax(self._values['high'][start:i + 1, j])
+        elif field == 'low':
+            partial = np.nanmin(self._values['low'][start:i + 1, j])
+        else:
+            partial = np.nansum(self._values['volume'][start:i + 1, j])
+        values = np.append(self._daily[field][lo:s, j], partial)
+        return self.sessions[lo:s + 1], values
+
+###################################################
+
+class BarData(object):
+    # history windows and derived series are cached for the current bar. When
+    # several algorithms share one BarData (see sim.runner.MultiRunner) a window
+    # requested by more than one of them is only fetched once. A shorter window
+    # of the same field is served as the tail of the longest one fetched so far
+
+    # transforms available through data.derived()
+    TRANSFORMS = {
+        'log10': np.log10,
+        'diff': np.diff,
+        'up': lambda v: np.diff(v) > 0,
+    }
+
+    def __init__(self, market):
+        self.market = market
+        self._i = 0
+        self._windows = {}
+        self._series = {}
+        self._derived = {}
+        self.hits = 0
+        self.misses = 0
+        # longest window requested per frequency, used to size warm-up periods
+        self.lookback = {}
+
+    @property
+    def i(self):
+        return self._i
+
+    @i.setter
+    def i(self, i):
+        if i != self._i:
+            self._windows.clear()
+            self._series.clear()
+            self._derived.clear()
+        self._i = i
+
+    def current(self, assets, field):
+        m = self.market
+        if isinstance(assets, Asset):
+            return m.value(field, self.i, m.column(assets))
+        return pd.Series([m.value(field, self.i, m.column(a)) for a in assets],
+                         index=list(assets))
+
+    def history(self, assets, field, bar_count, frequency):
+        if isinstance(assets, Asset):
+            return self._history(assets, field, bar_count, frequency)
+        return pd.DataFrame(dict((a, self._history(a, field, bar_count, frequency))
+                                 for a in assets))
+
+    def derived(self, asset, field, bar_count, frequency, transform):
+        # transform (see TRANSFORMS) applied to a history window. Returns a
+        # read-only array shared by every caller on this bar
+        key = (asset, field, bar_count, frequency, transform)
+        values = self._derived.get(key)
+        if values is None:
+            _, window = self._window(asset, field, bar_count, frequency)
+            values = self.TRANSFORMS[transform](window)
+            values.flags.writeable = False
+            self._derived[key] = values
+        return values
+
+    def _history(self, asset, field, bar_count, frequency):
+        key = (asset, field, bar_count, frequency)
+        series = self._series.get(key)
+        if series is None:
+            index, values = self._window(asset, field, bar_count, frequency)
+            series = self._series[key] = pd.Series(values, index=index, name=asset)
+        # hand out copies so one algorithm can't modify another's data
+        return series.copy()
+
+    def _window(self, asset, field, bar_count, frequency):
+        if bar_count > self.lookback.get(frequency, 0):
+            self.lookback[frequency] = bar_count
+        key = (asset, field, frequency)
+        cached = self._windows.get(key)
+        if cached is not None and len(cached[1]) >= bar_count:
+            self.hits += 1
+            index, values = cached
+            lo = len(values) - bar_count
+            return index[lo:], values[lo:]
+
+        self.misses += 1
+        m = self.market
+        if frequency == '1m':
+            index, values = m.minute_window(field, self.i, m.column(asset), bar_count)
+        elif frequency == '1d':
+            index, values = m.daily_window(field, self.i, m.column(asset), bar_count)
+        else:
+            raise ValueError("unsupported frequency: %r" % frequency)
+        if len(values) < bar_count:
+            raise HistoryError(
+                "history(%r, %r, %d, %r) at %s needs %d more bars of lead-in before "
+                "the start of the market data (%s); start the backtest later"
+                % (asset, field, bar_count, frequency, m.index[self.i],
+                   bar_count - len(values), m.index[0]))
+        values = np.array(values)
+        values.flags.writeable = False
+        self._windows[key] = (index, values)
+        return index, values
+
+    def can_trade(self, assets):
+        m = self.market
+        if isinstance(assets, Asset):
+            return not np.isnan(m.value('price', self.i, m.column(assets)))
+        return pd.Series([self.can_trade(a) for a in assets], index=list(assets))
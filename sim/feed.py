@@ -0,0 +1,37 @@
+"""
+Market feeds for the paper runner. A feed is an async iterator of bar indices
+into a MarketData object. ReplayFeed walks the stored minute bars between a
+start and end date, optionally pausing between bars so that a recorded or
+simulated session can be replayed at (a multiple of) wall clock speed.
+"""
+import asyncio
+
+import pandas as pd
+
+###################################################
+
+class ReplayFeed(object):
+
+    def __init__(self, market, start=None, end=None, pace=0.0):
+        # pace: seconds to wait between bars, 0 replays as fast as possible
+        self.market = market
+        self.pace = pace
+
+        sessions = market.sessions
+        first = 0 if start is None else sessions.searchsorted(pd.Timestamp(start))
+        last = len(sessions) - 1 if end is None else \
+            sessions.searchsorted(pd.Timestamp(end), side='right') - 1
+        self.first_bar = int(market.session_start[first])
+        self.last_bar = int(market.session_end[last])
+
+    def __aiter__(self):
+        return self._bars()
+
+    async def _bars(self):
+        for i in range(self.first_bar, self.last_bar + 1):
+            yield i
+            if self.pace:
+                await asyncio.sleep(self.pace)
+            else:
+                # still give fill notifications a chance to run between bars
+                await asyncio.sleep(0)
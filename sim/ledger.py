@@ -0,0 +1,201 @@
+"""
+Vectorized accounting for many simulated portfolios at once.
+
+sim.portfolio.Portfolio tracks one portfolio with python objects, which is fine
+for a single backtest but means a parameter sweep or Monte Carlo run of M
+backtests pays for M separate python loops. VectorLedger holds the cash,
+positions, cost basis, commissions and slippage of M portfolios over the same N
+assets as numpy arrays:
+
+    cash            (M,)     available cash
+    positions       (M, N)   shares held
+    cost_basis      (M, N)   average price paid per share held
+    commission_paid (M,)     total commissions charged
+    buys, sells     (M, N)   shares ordered but not yet filled, bought / sold
+
+Every order call applies to all M portfolios in one step. Amounts, targets,
+fractions of cash and prices can be scalars, (M,) arrays (one value per
+portfolio, e.g. a different weight per parameter set) or, for prices, (N,) /
+(M, N) arrays (the same market for every portfolio, or one simulated path per
+portfolio). A boolean 'where' mask of shape (M,) restricts an order to the
+portfolios whose signal called for it.
+
+Orders are queued and filled together by fill(), mirroring the next-bar fills
+of the simulated broker. Bought and sold shares are queued separately, so
+offsetting orders placed in the same step are both charged commission and
+slippage, as they would be at the broker ('pending' is their net). The sizing
+rules used by the algorithms map onto order_percent(), e.g. P1's 40% of cash
+per leg:
+
+    ledger.order_percent(s1, -0.40, prices, where=enter_high)
+    ledger.order_percent(s2, 0.40, prices, where=enter_high)
+    ...
+    ledger.fill(next_prices)
+
+Commission is charged per share and slippage as a fixed number of basis points
+against the direction of the trade. Both may differ per portfolio. The cost
+basis is updated once per fill() with the net shares traded at their average
+price.
+
+sim.sweep drives a ledger through a parameter sweep of P3.
+"""
+import numpy as np
+
+###################################################
+
+class VectorLedger(object):
+
+    def __init__(self, n_portfolios, assets, capital=100000.0, commission=0.001,
+                 slippage_bps=5.0, keep_fills=False):
+        m, n = n_portfolios, len(assets)
+        self.assets = list(assets)
+        self._col = dict((a, j) for j, a in enumerate(self.assets))
+
+        self.cash = np.empty(m)
+        self.cash[:] = capital
+        self.starting_cash = self.cash.copy()
+        self.positions = np.zeros((m, n), dtype=np.int64)
+        self.cost_basis = np.zeros((m, n))
+        self.last_price = np.zeros((m, n))
+        self.commission_paid = np.zeros(m)
+        self.buys = np.zeros((m, n), dtype=np.int64)
+        self.sells = np.zeros((m, n), dtype=np.int64)
+
+        # per portfolio commission per share + slippage as a fraction of price
+        self.commission = np.broadcast_to(np.asarray(commission, float), (m,))[:, None]
+        self.slippage = np.broadcast_to(np.asarray(slippage_bps, float) / 10000.0,
+                                        (m,))[:, None]
+
+        # optional fill log: list of (shares, prices) arrays, one entry per fill()
+        self.fills = [] if keep_fills else None
+
+    @property
+    def shape(self):
+        return self.positions.shape
+
+    def column(self, asset):
+        return self._col[asset]
+
+    @property
+    def pending(self):
+        # net shares ordered but not yet filled
+        return self.buys + self.sells
+
+    ###################################################
+    # valuation
+
+    def mark(self, prices):
+        # prices: (N,) or (M, N); NaN keeps the previous price
+        prices = np.broadcast_to(np.asarray(prices, float), self.shape)
+        self.last_price = np.where(np.isnan(prices), self.last_price, prices)
+
+    @property
+    def positions_value(self):
+        return (self.positions * self.last_price).sum(axis=1)
+
+    @property
+    def portfolio_value(self):
+        return self.cash + self.positions_value
+
+    @property
+    def leverage(self):
+        gross = np.abs(self.positions * self.last_price).sum(axis=1)
+        value = self.portfolio_value
+        return np.divide(gross, value, out=np.zeros_like(gross), where=value != 0)
+
+    ###################################################
+    # orders: each call queues shares for all M portfolios
+
+    def _queue(self, asset, shares, where):
+        # Quantopian rounds share amounts toward zero; amounts that aren't finite
+        # (e.g. a value ordered at a NaN price) are no order
+        shares = np.trunc(np.broadcast_to(np.asarray(shares, float), (self.shape[0],)))
+        shares = np.where(np.isfinite(shares), shares, 0).astype(np.int64)
+        if where is not None:
+            shares = np.where(where, shares, 0)
+        j = self.column(asset)
+        self.buys[:, j] += np.maximum(shares, 0)
+        self.sells[:, j] += np.minimum(shares, 0)
+
+    def order(self, asset, amounts, where=None):
+        self._queue(asset, amounts, where)
+
+    def order_target(self, asset, targets, where=None):
+        # like Quantopian (and sim.Algorithm), the target is measured against the
+        # shares held and open orders are ignored: the difference is ordered on top
+        # of anything already pending
+        targets = np.trunc(np.broadcast_to(np.asarray(targets, float), (self.shape[0],)))
+        self._queue(asset, targets - self.positions[:, self.column(asset)], where)
+
+    def order_value(self, asset, values, prices, where=None):
+        prices = self._asset_prices(asset, prices)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            shares = np.asarray(values, float) / prices
+        self._queue(asset, shares, where)
+
+    def order_percent(self, asset, fractions, prices, where=None):
+        # buy (or sell, for negative fractions) a fraction of each portfolio's cash
+        self.order_value(asset, self.cash * np.asarray(fractions, float), prices, where)
+
+    def cancel(self, asset=None, where=None):
+        cols = slice(None) if asset is None else self.column(asset)
+        if where is None:
+            self.buys[:, cols] = 0
+            self.sells[:, cols] = 0
+        else:
+            self.buys[where, cols] = 0
+            self.sells[where, cols] = 0
+
+    def _asset_prices(self, asset, prices):
+        prices = np.asarray(prices, float)
+        j = self.column(asset)
+        return prices[..., j] if prices.ndim == 2 else prices[j]
+
+    ###################################################
+    # fills
+
+    def fill(self, prices):
+        # fill every pending order at 'prices' ((N,) or (M, N)) in one step.
+        # Orders for assets without a price (NaN) stay pending
+        prices = np.broadcast_to(np.asarray(prices, float), self.shape)
+        tradeable = ~np.isnan(prices)
+        buys = np.where(tradeable, self.buys, 0)
+        sells = np.where(tradeable, self.sells, 0)
+        shares = buys + sells
+        if not (buys.any() or sells.any()):
+            self.mark(prices)
+            return shares
+
+        # buys and sells are priced + charged separately, like individual orders
+        price = np.where(tradeable, prices, 0.0)
+        value = (buys * (price * (1 + self.slippage))
+                 + sells * (price * (1 - self.slippage)))
+        commission = ((buys - sells) * self.commission).sum(axis=1)
+
+        self.cash -= value.sum(axis=1) + commission
+        self.commission_paid += commission
+
+        # average price of the net trade, used for the cost basis
+        with np.errstate(invalid='ignore', divide='ignore'):
+            exec_price = np.where(shares != 0, value / shares, price)
+
+        # average cost basis: unchanged when reducing a position, reset to the fill
+        # price when opening / flipping it, weighted average when adding to it
+        held = self.positions
+        new = held + shares
+        adding = (held * shares > 0)
+        opening = (held * new <= 0) & (new != 0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            averaged = (self.cost_basis * held + exec_price * shares) / new
+        self.cost_basis = np.where(adding, averaged,
+                                   np.where(opening, exec_price,
+                                            np.where(new == 0, 0.0, self.cost_basis)))
+
+        self.positions = new
+        self.buys = self.buys - buys
+        self.sells = self.sells - sells
+        self.mark(prices)
+
+        if self.fills is not None:
+            self.fills.append((shares, exec_price))
+        return shares
@@ -0,0 +1,82 @@
+"""
+Cash + position bookkeeping for a single simulated algorithm. Mirrors the
+attributes of Quantopian's context.portfolio and context.account objects that
+the algorithms in this repo read: cash, positions, portfolio_value and leverage.
+"""
+
+###################################################
+
+class Position(object):
+
+    def __init__(self, asset):
+        self.asset = asset
+        self.amount = 0
+        self.cost_basis = 0.0
+        self.last_sale_price = 0.0
+
+    def __repr__(self):
+        return 'Position(%r, amount=%d, cost_basis=%.4f)' % (
+            self.asset, self.amount, self.cost_basis)
+
+###################################################
+
+class Portfolio(object):
+
+    def __init__(self, starting_cash):
+        self.starting_cash = float(starting_cash)
+        self.cash = float(starting_cash)
+        self.positions = {}
+
+    @property
+    def positions_value(self):
+        return sum(p.amount * p.last_sale_price for p in self.positions.values())
+
+    @property
+    def portfolio_value(self):
+        return self.cash + self.positions_value
+
+    def apply_fill(self, fill):
+        pos = self.positions.get(fill.asset)
+        if pos is None:
+            pos = self.positions[fill.asset] = Position(fill.asset)
+
+        new_amount = pos.amount + fill.amount
+        # cost basis only moves when adding to a position in the same direction
+        if new_amount == 0:
+            pos.cost_basis = 0.0
+        elif pos.amount * fill.amount >= 0:
+            pos.cost_basis = ((pos.cost_basis * pos.amount + fill.price * fill.amount)
+                              / new_amount)
+        elif pos.amount * new_amount < 0:
+            # flipped from long to short or vice versa
+            pos.cost_basis = fill.price
+
+        pos.amount = new_amount
+        pos.last_sale_price = fill.price
+        self.cash -= fill.amount * fill.price + fill.commission
+
+        if pos.amount == 0:
+            del self.positions[fill.asset]
+
+    def mark(self, prices):
+        # prices: callable asset -> latest price (NaN when the asset didn't trade)
+        for pos in self.positions.values():
+            price = prices(pos.asset)
+            if price == price:
+                pos.last_sale_price = price
+
+###################################################
+
+class Account(object):
+
+    def __init__(self, portfolio):
+        self._portfolio = portfolio
+
+    @property
+    def leverage(self):
+        value = self._portfolio.portfolio_value
+        if value == 0:
+            return 0.0
+        gross = sum(abs(p.amount * p.last_sale_price)
+                    for p in self._portfolio.positions.values())
+        return gross / value
@@ -0,0 +1,201 @@
+"""
+Asyncio paper trading runner.
+
+The runner drives the algorithms' scheduled functions from a market feed the
+same way Quantopian does:
+
+    1. before_trading_start() is called once per session, before the first bar.
+
+    2. On every bar the broker first fills any orders that have become eligible.
+    Fill notifications arrive asynchronously on the broker's queue and are
+    applied to the portfolio of the algorithm that placed the order by a
+    separate task.
+
+    3. handle_data() and any scheduled function due on that bar are then called.
+    The orders each callback places are submitted to the broker as one batch
+    once the callback returns, so both legs of a pair go out together.
+
+    4. At the end of each session each portfolio's value is added to its equity
+    curve.
+
+When no start date (or feed) is given, the runners start late enough for every
+history window the algorithms ask for to be full, as on Quantopian, which always
+has data before the start of a backtest. How much history an algorithm needs is
+worked out by lead_in(): a short probe run on the last sessions of the market
+(which have the most history behind them) records the longest windows it
+requests. Only algorithms given as script paths are probed, since the probe
+loads a fresh copy of the script.
+
+PaperRunner hosts a single algorithm. MultiRunner hosts several algorithms in
+one process and walks the bar stream once for all of them. Each algorithm keeps
+its own context + portfolio, but they all read from the same BarData object, so
+history windows and derived series (log prices, diffs) that several of them ask
+for on the same bar are only fetched / computed once.
+
+Usage:
+
+    market = MarketData.from_csv('bars.csv')
+    result = PaperRunner('P1/JTopor-618-P1-PairsTrade.py', market,
+                         start='2016-01-04').run_sync()
+    result.equity.plot()
+
+    results = MultiRunner(['P1/JTopor-618-P1-PairsTrade.py',
+                           'P2/JTopor-618-P2-Ensemble.py',
+                           'P3/618-MP3-Signal-Processing.py'], market).run_sync()
+    results['JTopor-618-P2-Ensemble'].records
+
+"""
+import asyncio
+import math
+
+from sim.algorithm import Algorithm
+from sim.broker import SimulatedBroker
+from sim.data import BarData
+from sim.feed import ReplayFeed
+
+PROBE_SESSIONS = 2
+
+###################################################
+
+def history_sessions(lookback, market):
+    # sessions of data needed before a session for the history windows in
+    # lookback (BarData.lookback: frequency -> longest bar_count) to be full
+    length = market.session_end[0] - market.session_start[0] + 1
+    return max(lookback.get('1d', 0),
+               int(math.ceil(lookback.get('1m', 0) / float(length))))
+
+
+def lead_in(path, market, sessions=PROBE_SESSIONS):
+    # sessions of history the algorithm at path needs before its first session
+    first = max(len(market.sessions) - sessions, 0)
+    probe = PaperRunner(path, market, start=market.sessions[first])
+    probe.run_sync()
+    return history_sessions(probe.data.lookback, market)
+
+
+def default_start(paths, market):
+    # first session with enough history behind it for all of the scripts
+    needed = max([lead_in(p, market) for p in paths] or [0])
+    if needed >= len(market.sessions):
+        raise ValueError('the algorithms need %d sessions of history but the market '
+                         'data only has %d' % (needed, len(market.sessions)))
+    return market.sessions[needed]
+
+###################################################
+
+class MultiRunner(object):
+
+    def __init__(self, algorithms, market, broker=None, feed=None, start=None,
+                 end=None, capital=100000.0):
+        self.market = market
+        self.broker = broker or SimulatedBroker(market)
+        if feed is None and start is None:
+            start = default_start([a for a in algorithms if isinstance(a, str)], market)
+        self.feed = feed or ReplayFeed(market, start, end)
+        self.data = BarData(market)
+
+        self.algorithms = []
+        names = set()
+        for algo in algorithms:
+            if not isinstance(algo, Algorithm):
+                algo = Algorithm(algo, capital=capital)
+            # fills are routed by name, so hosting the same script twice needs unique names
+            base, n = algo.name, 1
+            while algo.name in names:
+                n += 1
+                algo.name = '%s-%d' % (base, n)
+            names.add(algo.name)
+
+            algo.broker = self.broker
+            algo.data = self.data
+            self.algorithms.append(algo)
+        self._by_name = dict((a.name, a) for a in self.algorithms)
+
+    def run_sync(self):
+        return asyncio.run(self.run())
+
+    async def run(self):
+        for algo in self.algorithms:
+            algo.initialize()
+        consumer = asyncio.ensure_future(self._apply_fills())
+        try:
+            session = None
+            async for i in self.feed:
+                s = self.market.session_of[i]
+                if s != session:
+                    if session is not None:
+                        self._close_session(session, i - 1)
+                    session = s
+                    due = await self._open_session(s, i)
+                await self._on_bar(i, due.get(i - self.market.session_start[s], ()))
+            if session is not None:
+                self._close_session(session, self.feed.last_bar)
+        finally:
+            consumer.cancel()
+
+        return dict((a.name, a.result()) for a in self.algorithms)
+
+    ###################################################
+
+    async def _open_session(self, s, i):
+        label = self.market.sessions[s]
+        length = self.market.session_end[s] - self.market.session_start[s] + 1
+
+        # before_trading_start sees the data as of the prior bar (last close)
+        self.data.i = max(i - 1, 0)
+        due = {}
+        for algo in self.algorithms:
+            algo.session = label
+            hook = getattr(algo.module, 'before_trading_start', None)
+            if hook is not None:
+                await self._call(algo, hook)
+
+            # work out which bar of the session each scheduled function is due on
+            for func, date_rule, time_rule in algo.scheduled:
+                if date_rule.matches(label):
+                    due.setdefault(time_rule.bar_index(length), []).append((algo, func))
+        return due
+
+    def _close_session(self, s, i):
+        self.data.i = i
+        for algo in self.algorithms:
+            algo.portfolio.mark(lambda a: self.data.current(a, 'price'))
+            algo.equity[self.market.sessions[s]] = algo.portfolio.portfolio_value
+
+    async def _on_bar(self, i, calls):
+        self.data.i = i
+
+        await self.broker.on_bar(i)
+        await self.broker.fills.join()
+
+        for algo in self.algorithms:
+            algo.portfolio.mark(lambda a: self.data.current(a, 'price'))
+            hook = getattr(algo.module, 'handle_data', None)
+            if hook is not None:
+                await self._call(algo, hook)
+        for algo, func in calls:
+            await self._call(algo, func)
+
+    async def _call(self, algo, func):
+        func(algo.context, self.data)
+        batch = algo.take_batch()
+        if batch:
+            await self.broker.submit(batch)
+
+    async def _apply_fills(self):
+        while True:
+            fill = await self.broker.fills.get()
+            self._by_name[fill.owner].apply_fill(fill)
+            self.broker.fills.task_done()
+
+###################################################
+
+class PaperRunner(MultiRunner):
+
+    def __init__(self, algorithm, market, **kwargs):
+        super(PaperRunner, self).__init__([algorithm], market, **kwargs)
+        self.algorithm = self.algorithms[0]
+
+    async def run(self):
+        results = await super(PaperRunner, self).run()
+        return results[self.algorithm.name]
@@ -0,0 +1,178 @@
+"""
+Date-sharded walk-forward backtests.
+
+A backtest over many years is split into consecutive date shards that run in
+separate processes. Every algorithm here carries state from one day to the
+next (P1's in_high / in_low flags, P2's fitted models, P3's Kalman filter), so
+each shard starts with a warm-up period: the algorithm is run, and trades,
+from an earlier session so that its state has caught up by the time the shard
+itself starts. Only the daily returns from the shard's own sessions are kept,
+and the returns of all shards are chained into one equity curve.
+
+The warm-up is sized automatically from the algorithm's state horizon:
+
+    1. A short probe run records the longest data.history() window the
+    algorithm asks for ('1d' windows count as sessions, '1m' windows are
+    rounded up to whole sessions), e.g. P1's 20 day lookback or P2's 300
+    minute window.
+
+    2. Algorithms whose state is periodically reset declare the period (in
+    sessions) as context.state_reset_period in initialize(); P3 re-initializes
+    its filter every context.max_filter_iter sessions and sets it to that. Their
+    warm-up is extended back to the last reset before the shard, counted from
+    the start of the backtest. From that point on the sharded run computes
+    exactly the same state as the serial run.
+
+Since the algorithms size their trades off current cash, which differs between
+a shard's warm-up and the serial run at the same date, the stitched equity
+curve is not bit for bit identical to a serial run once the algorithm trades.
+compare() reports how far the two are apart:
+
+    sharded = ShardedRunner(P3, market, start='2010-01-04', shards=8).run()
+    serial = PaperRunner(P3, market, start='2010-01-04').run_sync()
+    compare(serial.equity, sharded.equity)
+
+"""
+import multiprocessing
+import warnings
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from sim.algorithm import Algorithm
+from sim.feed import ReplayFeed
+from sim.runner import PaperRunner, default_start, history_sessions
+from sim.warm import strategy_imports, warm_pool
+
+Shard = namedtuple('Shard', 'warmup start end')
+ShardedResult = namedtuple('ShardedResult', 'equity records shards')
+
+PROBE_SESSIONS = 2
+
+###################################################
+
+def state_horizon(path, market, start=None):
+    # (lookback, reset period) in sessions for the algorithm at path
+    if start is None:
+        start = default_start([path], market)
+    feed = ReplayFeed(market, start)
+    first = market.session_of[feed.first_bar]
+    last = min(first + PROBE_SESSIONS, len(market.sessions)) - 1
+    probe = PaperRunner(path, market, start=market.sessions[first],
+                        end=market.sessions[last])
+    probe.run_sync()
+
+    sessions = history_sessions(probe.data.lookback, market)
+    period = getattr(probe.algorithm.context, 'state_reset_period', None)
+    return sessions, int(period) if period else None
+
+
+def plan(market, start, end, shards, lookback, period=None):
+    # split the sessions from start to end into shards with their warm-up starts
+    feed = ReplayFeed(market, start, end)
+    first = market.session_of[feed.first_bar]
+    last = market.session_of[feed.last_bar]
+    bounds = np.linspace(first, last + 1, shards + 1).round().astype(int)
+
+    plans = []
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        if hi <= lo:
+            continue
+        warm = max(lo - lookback, first)
+        if period:
+            # back to the last state reset, counting from the start of the backtest
+            warm = first + ((warm - first) // period) * period
+        plans.append(Shard(market.sessions[warm], market.sessions[lo],
+                           market.sessions[hi - 1]))
+    return plans
+
+
+def returns(equity, capital):
+    # daily returns of an equity curve, the first one against the starting capital
+    return equity / equity.shift(1).fillna(capital) - 1
+
+###################################################
+# worker side: the market is sent to each worker process once
+
+_market = None
+
+
+def _init_worker(market):
+    global _market
+    _market = market
+    warnings.simplefilter('ignore')
+
+
+def _run_shard(path, shard, capital):
+    result = PaperRunner(Algorithm(path, capital=capital), _market,
+                         start=shard.warmup, end=shard.end).run_sync()
+
+    # daily returns over warm-up + shard, keeping only the shard's own sessions
+    daily = returns(result.equity, capital)
+    records = result.records
+    if len(records):
+        records = records[records.index >= shard.start]
+    return daily[daily.index >= shard.start], records
+
+###################################################
+
+class ShardedRunner(object):
+
+    def __init__(self, path, market, start=None, end=None, shards=None, processes=None,
+                 capital=100000.0, warmup=None, modules=None):
+        # warmup: (lookback, reset period) in sessions; worked out by state_horizon()
+        # when not given. modules: loaded in this process before the workers are
+        # forked, by default the heavy modules the script imports
+        self.path = path
+        self.market = market
+        self.start = start
+        self.end = end
+        self.processes = processes or multiprocessing.cpu_count()
+        self.shards = shards or self.processes
+        self.capital = capital
+        self.warmup = warmup
+        self.modules = strategy_imports(path) if modules is None else modules
+
+    def plan(self):
+        if self.start is None:
+            # like PaperRunner: the first session with enough history behind it
+            self.start = default_start([self.path], self.market)
+        if self.warmup is None:
+            self.warmup = state_horizon(self.path, self.market, self.start)
+        lookback, period = self.warmup
+        return plan(self.market, self.start, self.end, self.shards, lookback, period)
+
+    def run(self):
+        shards = self.plan()
+        # workers fork from this process with the strategy's heavy modules loaded
+        with warm_pool(self.processes, initializer=_init_worker,
+                       initargs=(self.market,), modules=self.modules) as pool:
+            futures = [pool.submit(_run_shard, self.path, shard, self.capital)
+                       for shard in shards]
+            results = [f.result() for f in futures]
+
+        daily = pd.concat([r for r, _ in results])
+        equity = self.capital * (1 + daily).cumprod()
+        equity.name = self.path
+        records = [rec for _, rec in results if len(rec)]
+        records = pd.concat(records) if records else pd.DataFrame()
+        return ShardedResult(equity, records, shards)
+
+###################################################
+
+def compare(serial, sharded, capital=100000.0):
+    # how closely a stitched equity curve follows the serial run's
+    serial_returns = returns(serial, capital)
+    sharded_returns = returns(sharded, capital)
+    diff = (serial_returns - sharded_returns).abs()
+    # the correlation is NaN (not a warning) when either curve is flat
+    with np.errstate(invalid='ignore', divide='ignore'):
+        correlation = float(serial_returns.corr(sharded_returns))
+    return {
+        'sessions': len(serial),
+        'max_return_diff': float(diff.max()),
+        'mean_return_diff': float(diff.mean()),
+        'return_correlation': correlation,
+        'final_value_diff': float(sharded.iloc[-1] / serial.iloc[-1] - 1),
+    }
@@ -0,0 +1,126 @@
+"""
+Vectorized parameter sweeps.
+
+A sweep runs M variants of an algorithm that differ only in how they size or
+time their trades. The trading signal is computed once and the M portfolios are
+kept in a VectorLedger, so the whole sweep walks the market once instead of
+running M backtests.
+
+kalman_sweep() sweeps P3. The Kalman filter only sees prices, so its estimate
+and error band are the same for every variant; what varies per portfolio is
+
+    bands    entry / exit threshold as a multiple of the filter's std deviation
+             (P3 uses 1)
+    sizes    multiplier on P3's 30% - 90% of cash trade weights (P3 uses 1)
+
+Each variant follows use_kalman() exactly: the filter is updated once per
+session at the strategy's scheduled bar and reset every
+context.max_filter_iter updates, positions are closed once the error falls back
+inside the band and opened once it leaves it, and orders fill on the next bar
+with the same commission + slippage as the simulated broker. With bands=1 and
+sizes=1 the sweep reproduces a PaperRunner backtest of P3.
+
+    result = kalman_sweep(market, bands=[0.5, 1.0, 1.5, 2.0], sizes=[0.5, 1.0])
+    result.equity.iloc[-1].unstack()
+
+"""
+import os
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from sim.algorithm import Algorithm
+from sim.api import sid
+from sim.feed import ReplayFeed
+from sim.ledger import VectorLedger
+
+P3 = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                  'P3', '618-MP3-Signal-Processing.py')
+
+SweepResult = namedtuple('SweepResult', 'equity params ledger')
+
+###################################################
+
+def _grid(**params):
+    # every combination of the given parameter values, one row per portfolio
+    names = sorted(params)
+    values = [np.atleast_1d(np.asarray(params[n], float)) for n in names]
+    mesh = np.meshgrid(*values, indexing='ij')
+    return pd.DataFrame(dict((n, m.ravel()) for n, m in zip(names, mesh)))
+
+
+def _weights(trade_mag):
+    # P3's share of cash per trade by how far the error exceeds one std deviation
+    if trade_mag <= 0.5:
+        return 0.3
+    elif trade_mag <= 1:
+        return 0.5
+    elif trade_mag <= 1.5:
+        return 0.7
+    return 0.9
+
+
+def kalman_sweep(market, bands=1.0, sizes=1.0, s1=None, s2=None, start=None, end=None,
+                 capital=100000.0, commission=0.001, slippage_bps=5.0, path=P3):
+    # returns a SweepResult: equity (sessions x portfolios), params (one row per
+    # portfolio, the full grid of bands x sizes) and the final ledger
+    algo = Algorithm(path)
+    algo.initialize()
+    context = algo.context
+    s1 = sid(s1) if s1 is not None else context.s1
+    s2 = sid(s2) if s2 is not None else context.s2
+    _, _, time_rule = algo.scheduled[0]
+
+    params = _grid(band=bands, size=sizes)
+    band = params['band'].values
+    size = params['size'].values
+    ledger = VectorLedger(len(params), [s1, s2], capital, commission, slippage_bps)
+
+    feed = ReplayFeed(market, start, end)
+    first = market.session_of[feed.first_bar]
+    last = market.session_of[feed.last_bar]
+    prices = market.prices([s1, s2])
+
+    # the bar use_kalman() runs on in each session + the filter over all sessions
+    sessions = np.arange(first, last + 1)
+    lengths = market.session_end[sessions] - market.session_start[sessions] + 1
+    bars = np.array([market.session_start[s] + time_rule.bar_index(n)
+                     for s, n in zip(sessions, lengths)])
+    yhat, Q, e, _, _ = algo.module.kalman_replay(
+        prices[bars, 0], prices[bars, 1], context.delta, context.Ve,
+        reset_every=context.max_filter_iter)
+    sqrt_Q = np.sqrt(Q)
+
+    pos = np.zeros(len(params))    # 1 long, -1 short, 0 flat
+    equity = np.empty((len(sessions), len(params)))
+    for k, (s, i) in enumerate(zip(sessions, bars)):
+        ledger.mark(prices[i])
+        if yhat[k] != 0.:
+            limit = band * sqrt_Q[k]
+            closing = ((pos == 1) & (e[k] > -limit)) | ((pos == -1) & (e[k] < limit))
+            if closing.any():
+                ledger.order_target(s2, 0, where=closing)
+                pos[closing] = 0
+
+            weight = _weights(abs(e[k]) / sqrt_Q[k] - 1) * size
+            long = (pos == 0) & (e[k] < -limit)
+            short = (pos == 0) & (e[k] > limit)
+            if long.any() or short.any():
+                ledger.order_percent(s2, np.where(long, weight, -weight), prices[i],
+                                     where=long | short)
+                pos[long] = 1
+                pos[short] = -1
+
+        # orders fill on the following bars, as soon as the asset has a price
+        j = i + 1
+        while j <= feed.last_bar and (ledger.buys.any() or ledger.sells.any()):
+            ledger.fill(prices[j])
+            j += 1
+
+        ledger.mark(prices[market.session_end[s]])
+        equity[k] = ledger.portfolio_value
+
+    equity = pd.DataFrame(equity, index=market.sessions[sessions])
+    equity.columns = pd.MultiIndex.from_frame(params)
+    return SweepResult(equity, params, ledger)
@@ -0,0 +1,88 @@
+"""
+Fast startup for strategy processes.
+
+The algorithms import statsmodels (P1) and sklearn (P2) lazily, on the first
+test or model fit, so loading a strategy and running initialize() only costs
+numpy / pandas. The heavy import is still paid once per process though, which
+for a pool of backtest workers means once per worker. warm_pool() imports the
+heavy modules in the parent first and then forks the workers from it, so each
+worker starts with them already loaded:
+
+    modules = strategy_imports(path)
+    with warm_pool(4, initializer=_init_worker, initargs=(market,),
+                   modules=modules) as pool:
+        ...
+
+strategy_imports() lists the heavy modules a strategy script imports, deferred
+imports inside functions included, so a pool for P3 (which uses neither
+library) doesn't load them at all. Where fork isn't available the pool falls
+back to a forkserver with the modules preloaded, and to plain spawned workers
+after that.
+
+bench.startup measures how long each startup stage takes.
+"""
+import ast
+import importlib
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# packages whose import dominates a strategy's startup
+HEAVY_PACKAGES = ('statsmodels', 'sklearn')
+
+# modules the algorithms import on first use
+HEAVY_MODULES = (
+    'statsmodels.tsa.stattools',
+    'sklearn.ensemble',
+    'sklearn.svm',
+    'sklearn.naive_bayes',
+    'sklearn.kernel_approximation',
+    'sklearn.pipeline',
+)
+
+###################################################
+
+def prewarm(modules=HEAVY_MODULES):
+    # import the modules into this process; returns name -> seconds taken
+    # (0 for modules that were already loaded, None for missing ones)
+    timings = {}
+    for name in modules:
+        start = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            timings[name] = None
+            continue
+        timings[name] = time.perf_counter() - start
+    return timings
+
+
+def strategy_imports(path, packages=HEAVY_PACKAGES):
+    # the modules from 'packages' imported anywhere in the script at path. For
+    # 'from a.b import c' both a.b and a.b.c are listed since c may be a module;
+    # prewarm() skips the names that aren't
+    with open(path) as f:
+        tree = ast.parse(f.read(), path)
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.add(node.module)
+            names.update('%s.%s' % (node.module, alias.name) for alias in node.names)
+    return tuple(sorted(n for n in names if n.split('.')[0] in packages))
+
+
+def warm_pool(processes=None, initializer=None, initargs=(), modules=HEAVY_MODULES):
+    # ProcessPoolExecutor whose workers start with the heavy modules loaded
+    methods = multiprocessing.get_all_start_methods()
+    if 'fork' in methods:
+        prewarm(modules)
+        ctx = multiprocessing.get_context('fork')
+    elif 'forkserver' in methods:
+        ctx = multiprocessing.get_context('forkserver')
+        ctx.set_forkserver_preload(list(modules))
+    else:
+        ctx = multiprocessing.get_context('spawn')
+    return ProcessPoolExecutor(processes, mp_context=ctx, initializer=initializer,
+                               initargs=initargs)
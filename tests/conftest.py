@@ -0,0 +1,10 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def pytest_configure(config):
+    # the algorithms' statsmodels / sklearn calls warn about deprecated defaults
+    config.addinivalue_line('filterwarnings', 'ignore::FutureWarning')
+    config.addinivalue_line('filterwarnings', 'ignore::DeprecationWarning')
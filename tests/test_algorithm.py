@@ -0,0 +1,53 @@
+import asyncio
+import types
+
+from bench import synthetic
+from sim.algorithm import Algorithm
+from sim.api import sid
+from sim.broker import Order, SimulatedBroker
+from sim.data import BarData
+
+
+def _algorithm(market):
+    algo = Algorithm(types.ModuleType('algo'))
+    algo.broker = SimulatedBroker(market)
+    algo.data = BarData(market)
+    algo.data.i = 0
+    return algo
+
+
+def test_open_orders_are_orders_before_and_after_submit():
+    market, sids = synthetic.random_walk_bars(2, 1)
+    algo = _algorithm(market)
+    a, b = sid(sids[0]), sid(sids[1])
+
+    algo.order(a, 100)
+    submitted = algo.take_batch()
+    asyncio.run(algo.broker.submit(submitted))
+    algo.order(a, -20)
+    algo.order(b, 5)
+
+    orders = algo.get_open_orders(a)
+    assert [o.amount for o in orders] == [100, -20]
+    assert all(isinstance(o, Order) for o in orders)
+    assert [o.status for o in orders] == ['open', 'pending']
+
+    by_asset = algo.get_open_orders()
+    assert set(by_asset) == set([a, b])
+    assert all(isinstance(o, Order) for os_ in by_asset.values() for o in os_)
+
+
+def test_cancel_order_removes_pending_batch_entries():
+    market, sids = synthetic.random_walk_bars(1, 1)
+    algo = _algorithm(market)
+    a = sid(sids[0])
+
+    first = algo.order(a, 100)
+    second = algo.order(a, 50)
+    for order in algo.get_open_orders(a):
+        if order.amount == 100:
+            algo.cancel_order(order)
+
+    assert first.status == 'cancelled'
+    assert algo.get_open_orders(a) == [second]
+    assert algo.take_batch() == [second]
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from bench import synthetic
+from sim.api import sid
+from sim.data import BarData
+
+
+@pytest.fixture
+def market():
+    market, _ = synthetic.random_walk_bars(1, 25)
+    return market
+
+
+def _at(market, i):
+    data = BarData(market)
+    data.i = i
+    return data
+
+
+@pytest.mark.parametrize('frequency,longest,shorter', [('1d', 20, 5), ('1m', 300, 30)])
+def test_shorter_windows_are_the_tail_of_the_cached_one(market, frequency, longest,
+                                                        shorter):
+    a = sid(1)
+    i = market.session_start[22] + 100
+    data = _at(market, i)
+    data.history(a, 'price', longest, frequency)
+    window = data.history(a, 'price', shorter, frequency)
+    assert (data.misses, data.hits) == (1, 1)
+
+    expected = _at(market, i).history(a, 'price', shorter, frequency)
+    assert len(window) == shorter
+    assert window.index.equals(expected.index)
+    np.testing.assert_array_equal(window.values, expected.values)
+    assert data.lookback == {frequency: longest}
+
+
+def test_history_hands_out_copies(market):
+    a = sid(1)
+    data = _at(market, market.session_start[22])
+    window = data.history(a, 'price', 20, '1d')
+    window.iloc[:] = 0
+    assert (data.history(a, 'price', 20, '1d') > 0).all()
+
+
+def test_derived_is_shared_read_only_and_per_bar(market):
+    a = sid(1)
+    i = market.session_start[22] + 5
+    data = _at(market, i)
+    logs = data.derived(a, 'price', 20, '1d', 'log10')
+    np.testing.assert_array_equal(logs, np.log10(data.history(a, 'price', 20, '1d').values))
+    assert data.derived(a, 'price', 20, '1d', 'log10') is logs
+    assert not logs.flags.writeable
+
+    data.i = i + 1
+    assert data.derived(a, 'price', 20, '1d', 'log10') is not logs
@@ -0,0 +1,96 @@
+import types
+
+import numpy as np
+
+from bench import synthetic
+from sim.algorithm import Algorithm
+from sim.api import sid
+from sim.ledger import VectorLedger
+from sim.runner import PaperRunner
+
+
+def _random_orders(ledger, assets, seed):
+    # algorithm placing random order() / order_target() calls on every bar and
+    # mirroring each one in the ledger; returns the module + the per bar checks
+    rng = np.random.default_rng(seed)
+    checks = []
+    module = types.ModuleType('random_orders')
+
+    def initialize(context):
+        pass
+
+    def handle_data(context, data):
+        prices = np.array([data.current(a, 'price') for a in assets])
+        # the broker filled last bar's orders at this bar's price
+        ledger.fill(prices)
+        portfolio = context.portfolio
+        held = [portfolio.positions[a].amount if a in portfolio.positions else 0
+                for a in assets]
+        checks.append((portfolio.cash, ledger.cash[0], held, list(ledger.positions[0]),
+                       portfolio.portfolio_value, ledger.portfolio_value[0]))
+
+        for _ in range(rng.integers(0, 4)):
+            asset = assets[rng.integers(len(assets))]
+            amount = int(rng.integers(-200, 201))
+            if rng.random() < 0.3:
+                module.order_target(asset, amount)
+                ledger.order_target(asset, amount)
+            else:
+                module.order(asset, amount)
+                ledger.order(asset, amount)
+
+    module.initialize = initialize
+    module.handle_data = handle_data
+    return module, checks
+
+
+def test_single_portfolio_matches_broker_and_portfolio():
+    market, sids = synthetic.random_walk_bars(2, 3)
+    assets = [sid(s) for s in sids]
+    for seed in range(3):
+        ledger = VectorLedger(1, assets)
+        module, checks = _random_orders(ledger, assets, seed)
+        result = PaperRunner(Algorithm(module, name='random'), market).run_sync()
+
+        assert len(result.fills) > 100
+        for cash, ledger_cash, held, ledger_held, value, ledger_value in checks:
+            assert held == ledger_held
+            assert abs(cash - ledger_cash) < 1e-6
+            assert abs(value - ledger_value) < 1e-6
+
+
+def test_order_target_adds_to_pending_orders():
+    a = sid(1)
+    ledger = VectorLedger(1, [a])
+    ledger.order(a, 100)
+    ledger.order_target(a, 50)
+    ledger.fill([10.0])
+    assert ledger.positions[0, 0] == 150
+
+
+def test_offsetting_orders_pay_commission_and_slippage():
+    a = sid(1)
+    ledger = VectorLedger(2, [a], commission=0.001, slippage_bps=5.0)
+    ledger.order(a, 100)
+    ledger.order(a, -100, where=np.array([True, False]))
+    ledger.fill([100.0])
+
+    assert ledger.positions[0, 0] == 0
+    # 200 shares of commission + 5bps slippage on both sides
+    assert np.isclose(ledger.commission_paid[0], 0.2)
+    assert np.isclose(ledger.cash[0], 100000.0 - 0.2 - 2 * 100 * 100.0 * 0.0005)
+    assert np.isclose(ledger.commission_paid[1], 0.1)
+
+
+def test_orders_at_nan_prices_are_dropped():
+    a, b = sid(1), sid(2)
+    ledger = VectorLedger(2, [a, b])
+    ledger.order_value(a, 1000.0, [np.nan, 10.0])
+    # per portfolio price paths, one of them without a price for a
+    ledger.order_percent(a, 0.1, [[np.nan, 10.0], [20.0, 10.0]])
+    ledger.order_target(b, np.nan)
+    assert ledger.pending.tolist() == [[0, 0], [500, 0]]
+
+    ledger.fill([10.0, 10.0])
+    assert ledger.positions.tolist() == [[0, 0], [500, 0]]
+    assert ledger.cash[0] == 100000.0
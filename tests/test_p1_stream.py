@@ -0,0 +1,71 @@
+import os
+
+import numpy as np
+import pytest
+from statsmodels.tsa.adfvalues import mackinnonp
+from statsmodels.tsa.stattools import adfuller, coint
+
+from sim.algorithm import load_module
+
+P1 = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                  'P1', 'JTopor-618-P1-PairsTrade.py')
+
+
+@pytest.fixture(scope='module')
+def p1():
+    return load_module(P1)
+
+
+def _pair(n, seed=3):
+    # log prices of a cointegrated pair: x is a random walk, y = x + AR(1) spread
+    rng = np.random.default_rng(seed)
+    x = np.log10(50) + np.cumsum(rng.normal(0, 2e-4, n))
+    spread = np.zeros(n)
+    for t in range(1, n):
+        spread[t] = 0.97 * spread[t - 1] + rng.normal(0, 1e-4)
+    return x, x + 0.1 + spread
+
+
+@pytest.mark.parametrize('lags', [0, 1, 3])
+def test_streaming_tests_match_statsmodels(p1, lags):
+    window = 120
+    x, y = _pair(700)
+    stream = p1.StreamingCointegration(window, lags=lags)
+    checked = 0
+    for t in range(len(x)):
+        stream.update(x[t], y[t])
+        # every 37 bars, which lands at different points of the rebuild cycle
+        if not stream.ready or t % 37:
+            continue
+        wx, wy = x[t - window + 1:t + 1], y[t - window + 1:t + 1]
+        for series, values in ((0, wx), (1, wy)):
+            expected = adfuller(values, maxlag=lags, autolag=None, regression='c')
+            np.testing.assert_allclose(stream.adf(series), expected[:2], rtol=1e-8,
+                                       atol=1e-10)
+        expected = coint(wx, wy, maxlag=lags, autolag=None)
+        np.testing.assert_allclose(stream.coint(), expected[:2], rtol=1e-8, atol=1e-10)
+        checked += 1
+    assert checked >= 10
+
+
+def test_flat_window_is_not_cointegrated(p1):
+    rng = np.random.default_rng(0)
+    stream = p1.StreamingCointegration(390, lags=1)
+    for t in range(400):
+        stream.update(1.7, 1.5 + rng.normal(0, 1e-3))
+    assert stream.ready
+    assert stream.adf(0)[1] == 1.0
+    assert stream.coint()[1] == 1.0
+
+    stream = p1.StreamingCointegration(390, lags=1)
+    for t in range(400):
+        stream.update(1.7 + rng.normal(0, 1e-3), 1.5)
+    assert stream.adf(1)[1] == 1.0
+    assert stream.coint()[1] == 1.0
+
+
+
+@pytest.mark.parametrize('N', [1, 2])
+def test_bundled_mackinnon_pvalues(p1, N):
+    for stat in np.linspace(-25, 5, 601):
+        assert abs(p1.mackinnon_pvalue(stat, N) - mackinnonp(stat, 'c', N)) < 1e-12
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from bench import synthetic
+from bench.run import P2
+from sim.algorithm import Algorithm
+from sim.broker import SimulatedBroker
+from sim.data import BarData
+
+
+@pytest.fixture
+def market():
+    market, _ = synthetic.random_walk_bars(1, 3, sids=[24])
+    return market
+
+
+def _p2(market, **settings):
+    algo = Algorithm(P2)
+    algo.broker = SimulatedBroker(market)
+    algo.data = BarData(market)
+    algo.initialize()
+    for name, value in settings.items():
+        setattr(algo.context, name, value)
+    algo.session = market.sessions[1]
+    return algo
+
+
+def test_approx_svc_fits_and_predicts_through_model_trade(market):
+    algo = _p2(market, svc_mode='approx', svc_compare=True)
+    assert algo.context.SVC_exact is None
+
+    for i in range(market.session_start[1] + 60, market.session_start[1] + 240, 60):
+        algo.data.i = i
+        algo.module.model_trade(algo.context, algo.data)
+
+    context = algo.context
+    steps = [name for name, _ in context.SVC.steps]
+    assert steps == ['nystroem', 'linearsvc']
+    # the Nystroem kernel width is the one the exact SVC works out for gamma='scale'
+    assert context.SVC_exact.get_params()['gamma'] == 'scale'
+    assert np.isclose(context.SVC.get_params()['nystroem__gamma'],
+                      context.SVC_exact._gamma)
+
+    assert context.svc_checks == 3
+    assert context.SVC_pred in (0, 1)
+    agreement = algo.records[market.sessions[1]]['SVC_agreement']
+    assert agreement == context.svc_agree / 3.0
+
+
+def test_exact_mode_has_no_comparison(market):
+    algo = _p2(market, svc_compare=True)
+    algo.data.i = market.session_start[1] + 60
+    algo.module.model_trade(algo.context, algo.data)
+    assert algo.context.SVC_exact is None
+    assert 'SVC_agreement' not in algo.records[market.sessions[1]]
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from bench.run import P2
+from sim.algorithm import load_module
+
+
+@pytest.fixture(scope='module')
+def p2():
+    return load_module(P2)
+
+
+def _check(p2, forest, X):
+    flat = p2.compile_forest(forest)
+    expected = forest.predict(X)
+    np.testing.assert_array_equal(p2.forest_predict(flat, X), expected)
+    # one row at a time, as trade() calls it
+    for row, label in zip(X[:200], expected[:200]):
+        assert p2.forest_predict(flat, row.reshape(1, -1))[0] == label
+        assert p2.forest_predict(flat, row)[0] == label
+
+
+def test_forest_predict_on_binary_features(p2):
+    # P2's features: 0/1 up / down flags of 4 fields over 14 bars
+    rng = np.random.default_rng(0)
+    X = (rng.random((600, 56)) > 0.5).astype(float)
+    Y = (X[:, :3].sum(axis=1) + rng.random(600) > 2).astype(int)
+    forest = RandomForestClassifier(n_estimators=20, random_state=1).fit(X, Y)
+    _check(p2, forest, (rng.random((3000, 56)) > 0.5).astype(float))
+
+
+def test_forest_predict_on_continuous_features(p2):
+    rng = np.random.default_rng(1)
+    X = rng.normal(size=(500, 8))
+    Y = rng.integers(0, 3, 500)
+    forest = RandomForestClassifier(n_estimators=15, random_state=2).fit(X, Y)
+    _check(p2, forest, rng.normal(size=(3000, 8)))
+
+
+def test_forest_predict_on_near_ties(p2):
+    # one-split trees on either of two features; for the first row a split on
+    # feature 0 gives class probabilities (1/3, 2/3) and one on feature 1 gives
+    # (2/3, 1/3). With as many trees of each kind the classes tie, and how the
+    # tie is broken comes down to rounding in the order the trees are summed
+    cells = {(0, 0): [0, 0, 1], (0, 1): [1, 1, 1], (1, 0): [0, 0, 1], (1, 1): [0, 1, 0]}
+    X = np.array([cell for cell, labels in cells.items() for _ in labels], float)
+    Y = np.array([y for labels in cells.values() for y in labels])
+
+    ties = set()
+    for random_state in range(40):
+        forest = RandomForestClassifier(n_estimators=20, random_state=random_state,
+                                        bootstrap=False, max_features=1,
+                                        max_depth=1).fit(X, Y)
+        proba = forest.predict_proba(X[:1])[0]
+        if abs(proba[0] - proba[1]) < 1e-12:
+            ties.add(forest.predict(X[:1])[0])
+        _check(p2, forest, X)
+    # ties resolved both ways by rounding alone
+    assert ties == {0, 1}
@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+from sim.algorithm import Algorithm
+from sim.sweep import P3
+
+STEPS = 300
+
+
+class Reference(object):
+    # P3's filter as it was written before kalman_update(): 2x2 numpy arrays,
+    # P = R - K x R, reset back to beta = 0, P = 0, R = None
+
+    def __init__(self, delta=0.0001, ve=0.001):
+        self.Vw = delta / (1 - delta) * np.eye(2)
+        self.Ve = ve
+        self.reset()
+
+    def reset(self):
+        self.beta = np.zeros(2)
+        self.P = np.zeros((2, 2))
+        self.R = None
+
+    def update(self, x, y):
+        x = np.asarray([x, 1.0]).reshape((1, 2))
+        if self.R is not None:
+            self.R = self.P + self.Vw
+        else:
+            self.R = np.zeros((2, 2))
+        yhat = x.dot(self.beta)[0]
+        Q = x.dot(self.R).dot(x.T)[0, 0] + self.Ve
+        e = y - yhat
+        K = self.R.dot(x.T) / Q
+        self.beta = self.beta + K.flatten() * e
+        self.P = self.R - K * x.dot(self.R)
+        return yhat, Q, e
+
+
+def _prices(n=STEPS, seed=0):
+    rng = np.random.default_rng(seed)
+    xs = 40 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    ys = 3.0 + 0.8 * xs + rng.normal(0, 0.5, n)
+    return xs, ys
+
+
+def _reference(xs, ys, reset_every=None):
+    ref = Reference()
+    out = []
+    for i, (x, y) in enumerate(zip(xs, ys)):
+        if reset_every and i % reset_every == 0:
+            ref.reset()
+        yhat, Q, e = ref.update(x, y)
+        out.append((yhat, Q, e, ref.beta[0], ref.beta[1]))
+    return np.array(out).T
+
+
+def _close(actual, expected):
+    np.testing.assert_allclose(actual, expected, rtol=1e-9, atol=1e-12)
+
+
+def test_kalman_update_matches_reference_across_filter_resets():
+    algo = Algorithm(P3)
+    algo.initialize()
+    context, module = algo.context, algo.module
+    xs, ys = _prices()
+
+    # the same reset schedule as use_kalman()
+    out = []
+    resets = 0
+    for x, y in zip(xs, ys):
+        if context.filter_iter == context.max_filter_iter:
+            module.filter_reset(context, None)
+            resets += 1
+        context.filter_iter += 1
+        yhat, Q, e = module.kalman_update(context.kf, x, y, context.Vw, context.Ve)
+        out.append((yhat, Q, e, context.kf[0], context.kf[1]))
+    assert resets == (STEPS - 1) // context.max_filter_iter
+
+    expected = _reference(xs, ys, reset_every=context.max_filter_iter)
+    for actual, ref in zip(np.array(out).T, expected):
+        _close(actual, ref)
+
+
+@pytest.mark.parametrize('reset_every', [None, 120, 7])
+def test_kalman_replay_matches_reference(reset_every):
+    module = Algorithm(P3).module
+    xs, ys = _prices()
+    actual = module.kalman_replay(xs, ys, reset_every=reset_every)
+    expected = _reference(xs, ys, reset_every=reset_every)
+    for a, ref in zip(actual, expected):
+        _close(a, ref)
+
+    # the first update after each reset starts from beta = 0, R = 0
+    yhat, Q = actual[0], actual[1]
+    first = np.arange(0, STEPS, reset_every or STEPS)
+    assert (yhat[first] == 0).all()
+    np.testing.assert_allclose(Q[first], 0.001)
@@ -0,0 +1,59 @@
+import pytest
+
+from bench import synthetic
+from bench.run import P1, P2, P3
+from sim.data import HistoryError
+from sim.runner import MultiRunner, PaperRunner, lead_in
+
+
+def test_p1_runs_from_the_start_of_the_data():
+    market, _ = synthetic.cointegrated_pairs(1, 24, sids=[19660, 2351])
+    assert lead_in(P1, market) == 20
+
+    runner = PaperRunner(P1, market)
+    result = runner.run_sync()
+    # the first session has 20 sessions of history behind it
+    assert result.equity.index[0] == market.sessions[20]
+    assert len(result.records) == 4
+
+
+def test_p2_runs_from_the_start_of_the_data():
+    market, _ = synthetic.random_walk_bars(1, 3, sids=[24])
+    result = PaperRunner(P2, market).run_sync()
+    assert result.equity.index[0] == market.sessions[1]
+    assert len(result.fills) > 0
+
+
+def test_explicit_start_without_history_names_the_lead_in():
+    market, _ = synthetic.random_walk_bars(1, 3, sids=[24])
+    with pytest.raises(HistoryError, match='lead-in'):
+        PaperRunner(P2, market, start=market.sessions[0]).run_sync()
+
+
+def test_too_little_data_for_the_lead_in():
+    market, _ = synthetic.cointegrated_pairs(1, 5, sids=[19660, 2351])
+    with pytest.raises(HistoryError, match='lead-in'):
+        PaperRunner(P1, market)
+
+
+def _trades(result):
+    # fills without the broker's order ids, which depend on who else is trading
+    return [(f.asset, f.amount, f.price, f.commission, f.dt) for f in result.fills]
+
+
+def test_multi_runner_matches_separate_runs():
+    market, _ = synthetic.random_walk_bars(5, 24, vol=2e-3,
+                                           sids=[19660, 2351, 24, 2673, 40430])
+    results = MultiRunner([P1, P2, P2, P3], market).run_sync()
+    assert sorted(results) == ['618-MP3-Signal-Processing', 'JTopor-618-P1-PairsTrade',
+                               'JTopor-618-P2-Ensemble', 'JTopor-618-P2-Ensemble-2']
+    start = results['JTopor-618-P1-PairsTrade'].equity.index[0]
+    assert start == market.sessions[20]
+
+    for name, path in [('JTopor-618-P1-PairsTrade', P1), ('JTopor-618-P2-Ensemble', P2),
+                       ('JTopor-618-P2-Ensemble-2', P2), ('618-MP3-Signal-Processing', P3)]:
+        alone = PaperRunner(path, market, start=start).run_sync()
+        assert _trades(results[name]) == _trades(alone)
+        assert results[name].equity.equals(alone.equity)
+    assert len(results['JTopor-618-P2-Ensemble-2'].fills) > 0
+    assert len(results['618-MP3-Signal-Processing'].fills) > 0
@@ -0,0 +1,31 @@
+import numpy as np
+
+from bench import synthetic
+from sim.algorithm import Algorithm
+from sim.runner import PaperRunner
+from sim.sweep import P3, kalman_sweep
+
+
+def test_kalman_sweep_reproduces_p3_backtest():
+    market, pairs = synthetic.linear_pairs(1, 150, noise=2.0)
+    s1, s2 = pairs[0]
+
+    algo = Algorithm(P3)
+    initialize = algo.module.initialize
+
+    def on_pair(context):
+        initialize(context)
+        context.s1 = algo.module.sid(s1)
+        context.s2 = algo.module.sid(s2)
+
+    algo.module.initialize = on_pair
+    serial = PaperRunner(algo, market).run_sync()
+    assert len(serial.fills) > 50
+
+    sweep = kalman_sweep(market, bands=[1.0, 2.0], sizes=[1.0, 0.5], s1=s1, s2=s2)
+    assert list(sweep.params.itertuples(index=False)) == [(1.0, 1.0), (1.0, 0.5),
+                                                          (2.0, 1.0), (2.0, 0.5)]
+    np.testing.assert_allclose(sweep.equity[(1.0, 1.0)].values, serial.equity.values,
+                               rtol=1e-10)
+    # the other variants trade differently
+    assert not np.allclose(sweep.equity[(2.0, 0.5)].values, serial.equity.values)
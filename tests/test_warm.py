@@ -0,0 +1,19 @@
+from sim.shard import ShardedRunner
+from sim.sweep import P3
+from sim.warm import strategy_imports
+
+from bench import synthetic
+from bench.run import P1, P2
+
+
+def test_strategy_imports_find_deferred_imports():
+    assert 'statsmodels.tsa.stattools' in strategy_imports(P1)
+    assert set(['sklearn.ensemble', 'sklearn.svm', 'sklearn.naive_bayes',
+                'sklearn.kernel_approximation', 'sklearn.pipeline']) <= set(strategy_imports(P2))
+    assert strategy_imports(P3) == ()
+
+
+def test_sharded_runner_only_warms_the_strategy_modules():
+    market, _ = synthetic.random_walk_bars(1, 2)
+    assert ShardedRunner(P3, market).modules == ()
+    assert ShardedRunner(P1, market).modules == strategy_imports(P1)